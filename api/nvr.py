@@ -2,6 +2,8 @@
 
 import asyncio
 import json
+import logging
+import re
 from typing import List, Optional
 from fastapi import APIRouter, HTTPException, Depends
 from pydantic import BaseModel, Field
@@ -11,6 +13,8 @@ from core.nvr_discovery import nvr_discovery, NVRBrand
 from core.vision_analyzer import vision_analyzer
 from api.auth import require_auth
 
+logger = logging.getLogger(__name__)
+
 router = APIRouter(prefix="/api/nvr", tags=["nvr"])
 
 
@@ -175,6 +179,8 @@ async def import_cameras(
     results = []
     imported = 0
     failed = 0
+    pending = []  # (result index, channel_id, name, Stream), inserted together below
+    seen_urls = set()
 
     for cam in data.cameras:
         channel_id = cam.get("channel_id", 0)
@@ -194,60 +200,65 @@ async def import_cameras(
 
         # Check if URL already exists
         existing = await db.get_stream_by_url(rtsp_url)
-        if existing:
+        if existing or rtsp_url in seen_urls:
             results.append(ImportResult(
                 channel_id=channel_id,
                 name=name,
                 success=False,
-                stream_id=existing.id,
+                stream_id=existing.id if existing else None,
                 error="Stream with this URL already exists"
             ))
             failed += 1
             continue
+        seen_urls.add(rtsp_url)
+
+        # Determine group name - use provided or extract NVR IP from RTSP URL
+        group = data.group_name
+        if not group:
+            # Extract IP from rtsp://user:pass@IP:port/...
+            match = re.search(r'@([\d.]+):', rtsp_url)
+            if match:
+                group = f"NVR {match.group(1)}"
+
+        pending.append((len(results), channel_id, name, Stream(
+            name=name,
+            rtsp_url=rtsp_url,
+            mode=data.mode,
+            latency_mode=data.latency_mode,
+            keep_alive_seconds=60,
+            group_name=group
+        )))
+        results.append(None)  # Filled in once the streams are inserted
+
+    # Create all streams in one transaction; if that fails, insert them one
+    # by one so a single bad camera doesn't fail the whole import
+    errors = {}  # result index -> error
+    try:
+        await db.add_streams([stream for _, _, _, stream in pending])
+    except Exception as e:
+        logger.warning(f"Bulk camera import failed ({e}), importing cameras individually")
+        for index, _, _, stream in pending:
+            try:
+                await db.add_stream(stream)
+            except Exception as e:
+                errors[index] = str(e)
 
-        try:
-            # Determine group name - use provided or extract NVR IP from RTSP URL
-            group = data.group_name
-            if not group:
-                # Extract IP from rtsp://user:pass@IP:port/...
-                import re
-                match = re.search(r'@([\d.]+):', rtsp_url)
-                if match:
-                    group = f"NVR {match.group(1)}"
-
-            # Create stream
-            stream = Stream(
-                name=name,
-                rtsp_url=rtsp_url,
-                mode=data.mode,
-                latency_mode=data.latency_mode,
-                keep_alive_seconds=60,
-                group_name=group
-            )
-            stream = await db.add_stream(stream)
-
+    from core.stream_manager import stream_manager
+    for index, channel_id, name, stream in pending:
+        error = errors.get(index)
+        if error is None:
             # Capture thumbnail in background
-            import asyncio
-            from core.stream_manager import stream_manager
             asyncio.create_task(stream_manager.capture_stream_thumbnail(stream.id))
-
-            results.append(ImportResult(
-                channel_id=channel_id,
-                name=name,
-                success=True,
-                stream_id=stream.id,
-                error=None
-            ))
             imported += 1
-        except Exception as e:
-            results.append(ImportResult(
-                channel_id=channel_id,
-                name=name,
-                success=False,
-                stream_id=None,
-                error=str(e)
-            ))
+        else:
             failed += 1
+        results[index] = ImportResult(
+            channel_id=channel_id,
+            name=name,
+            success=error is None,
+            stream_id=stream.id if error is None else None,
+            error=error
+        )
 
     return CameraImportResponse(
         total=len(data.cameras),
@@ -297,7 +308,8 @@ async def analyze_cameras_batch(
     """
     Analyze multiple cameras in batch to suggest names.
 
-    Processes cameras concurrently (max 3 at a time) to speed up analysis.
+    Frames are captured concurrently (max 3 at a time) and sent to Claude
+    in batched requests of up to 20 images.
     """
     # Get Claude API key
     api_key = await db.get_setting("claude_api_key")
@@ -311,52 +323,54 @@ async def analyze_cameras_batch(
     success = 0
     failed = 0
 
-    # Process in batches of 3 to avoid overwhelming the API
-    semaphore = asyncio.Semaphore(3)
+    # Capture frames (max 3 at a time), then analyze them in batched API requests
+    cameras = []
+    for index, camera in enumerate(data.cameras):
+        rtsp_url = camera.get("rtsp_url_main") or camera.get("rtsp_url")
+        if rtsp_url:
+            cameras.append((index, rtsp_url))
+
+    try:
+        analyses = await vision_analyzer.analyze_rtsp_streams_batch(cameras, api_key)
+        batch_error = None
+    except Exception as e:
+        logger.exception(f"Batch camera analysis failed: {e}")
+        analyses = {}
+        batch_error = str(e)
 
-    async def analyze_one(camera: dict) -> dict:
-        nonlocal success, failed
-        async with semaphore:
-            channel_id = camera.get("channel_id", 0)
-            rtsp_url = camera.get("rtsp_url_main") or camera.get("rtsp_url")
+    submitted = {index for index, _ in cameras}
+    for index, camera in enumerate(data.cameras):
+        channel_id = camera.get("channel_id", 0)
+        result = analyses.get(index)
 
-            if not rtsp_url:
-                failed += 1
-                return {
-                    "channel_id": channel_id,
-                    "original_name": camera.get("name", ""),
-                    "suggested_name": camera.get("name", f"Camera {channel_id}"),
-                    "error": "No RTSP URL"
-                }
+        if result is None:
+            failed += 1
+            if index not in submitted:
+                error = "No RTSP URL"
+            else:
+                error = batch_error or "No analysis result"
+            results.append({
+                "channel_id": channel_id,
+                "original_name": camera.get("name", ""),
+                "suggested_name": camera.get("name", f"Camera {channel_id}"),
+                "error": error
+            })
+            continue
 
-            try:
-                result = await vision_analyzer.analyze_rtsp_stream(rtsp_url, api_key)
-                if result.error:
-                    failed += 1
-                else:
-                    success += 1
-
-                return {
-                    "channel_id": channel_id,
-                    "original_name": camera.get("name", ""),
-                    "suggested_name": result.suggested_name,
-                    "text_found": result.text_found,
-                    "scene_description": result.scene_description,
-                    "confidence": result.confidence,
-                    "error": result.error
-                }
-            except Exception as e:
-                failed += 1
-                return {
-                    "channel_id": channel_id,
-                    "original_name": camera.get("name", ""),
-                    "suggested_name": camera.get("name", f"Camera {channel_id}"),
-                    "error": str(e)
-                }
-
-    # Run all analyses concurrently
-    tasks = [analyze_one(cam) for cam in data.cameras]
-    results = await asyncio.gather(*tasks)
+        if result.error:
+            failed += 1
+        else:
+            success += 1
+
+        results.append({
+            "channel_id": channel_id,
+            "original_name": camera.get("name", ""),
+            "suggested_name": result.suggested_name,
+            "text_found": result.text_found,
+            "scene_description": result.scene_description,
+            "confidence": result.confidence,
+            "error": result.error
+        })
 
     return BatchAnalyzeResponse(
         results=list(results),
@@ -1,10 +1,13 @@
 """Settings API endpoints."""
 
+import asyncio
 from typing import Optional
 from fastapi import APIRouter, HTTPException, Depends
 from pydantic import BaseModel, Field
 
 from database import db
+from core.stream_manager import stream_manager
+from core.vision_analyzer import vision_analyzer
 from api.auth import require_auth
 
 router = APIRouter(prefix="/api/settings", tags=["settings"])
@@ -102,6 +105,8 @@ async def update_server_settings(
     if data.hls_list_size is not None:
         await db.set_setting("hls_list_size", str(data.hls_list_size))
 
+    stream_manager.invalidate_runtime_settings()
+
     # Return updated settings
     return await get_server_settings(_)
 
@@ -132,6 +137,8 @@ async def set_claude_api_key(
 
     # Store the key
     await db.set_setting("claude_api_key", data.api_key)
+    # Name suggestions are likely next; get the connection ready
+    asyncio.create_task(vision_analyzer.warmup())
 
     return {
         "status": "ok",
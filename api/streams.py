@@ -3,7 +3,7 @@
 import asyncio
 import json
 from typing import List, Optional
-from fastapi import APIRouter, HTTPException, Depends, Request, Query
+from fastapi import APIRouter, HTTPException, Depends, Request, Query, Response
 from pydantic import BaseModel, Field
 
 from config import settings
@@ -60,7 +60,7 @@ class StreamResponse(BaseModel):
     latency_mode: str
     ffmpeg_overrides: Optional[dict]
     group_name: Optional[str]
-    thumbnail: Optional[str]
+    thumbnail: Optional[str]  # URL of the thumbnail image endpoint
     thumbnail_updated: Optional[str]
     created_at: Optional[str]
     updated_at: Optional[str]
@@ -94,7 +94,10 @@ class StreamResponse(BaseModel):
             latency_mode=stream.latency_mode or "stable",
             ffmpeg_overrides=overrides,
             group_name=stream.group_name,
-            thumbnail=stream.thumbnail,
+            thumbnail=(
+                f"{base_url}/api/streams/{stream.id}/thumbnail?v={stream.thumbnail_updated}"
+                if stream.thumbnail else None
+            ),
             thumbnail_updated=stream.thumbnail_updated,
             created_at=stream.created_at,
             updated_at=stream.updated_at,
@@ -348,11 +351,11 @@ async def batch_stop_streams(
                 failed.append({"id": stream_id, "error": "Stream not found"})
                 continue
 
-            if not stream_manager.is_running(stream_id):
+            # Also stops a stream that is still starting
+            if not await stream_manager.stop_stream(stream_id):
                 failed.append({"id": stream_id, "error": "Not running"})
                 continue
 
-            await stream_manager.stop_stream(stream_id)
             success.append(stream_id)
         except Exception as e:
             failed.append({"id": stream_id, "error": str(e)})
@@ -380,9 +383,8 @@ async def batch_restart_streams(
                 failed.append({"id": stream_id, "error": "Stream not found"})
                 continue
 
-            # Stop if running
-            if stream_manager.is_running(stream_id):
-                await stream_manager.stop_stream(stream_id)
+            # Stop if running or still starting (no-op otherwise)
+            await stream_manager.stop_stream(stream_id)
 
             # Start
             result = await stream_manager.start_stream(stream_id)
@@ -417,9 +419,8 @@ async def batch_delete_streams(
                 failed.append({"id": stream_id, "error": "Stream not found"})
                 continue
 
-            # Stop if running
-            if stream_manager.is_running(stream_id):
-                await stream_manager.stop_stream(stream_id)
+            # Stop if running or still starting (no-op otherwise)
+            await stream_manager.stop_stream(stream_id)
 
             await db.delete_stream(stream_id)
             success.append(stream_id)
@@ -512,9 +513,8 @@ async def delete_stream(
     if not stream:
         raise HTTPException(status_code=404, detail="Stream not found")
 
-    # Stop if running
-    if stream_manager.is_running(stream_id):
-        await stream_manager.stop_stream(stream_id)
+    # Stop if running or still starting (no-op otherwise)
+    await stream_manager.stop_stream(stream_id)
 
     # Delete from database
     await db.delete_stream(stream_id)
@@ -609,11 +609,10 @@ async def stop_stream(
     if not stream:
         raise HTTPException(status_code=404, detail="Stream not found")
 
-    if not stream_manager.is_running(stream_id):
+    # Also stops a stream that is still starting
+    if not await stream_manager.stop_stream(stream_id):
         raise HTTPException(status_code=400, detail="Stream not running")
 
-    await stream_manager.stop_stream(stream_id)
-
     status = stream_manager.get_stream_status(stream_id)
     return StatusResponse(stream_id=stream_id, **status)
 
@@ -691,13 +690,34 @@ async def capture_snapshot(
     if not thumbnail:
         raise HTTPException(status_code=500, detail="Failed to capture snapshot")
 
+    stream.thumbnail = thumbnail
     return {
         "status": "ok",
-        "thumbnail": thumbnail,
+        "thumbnail": stream.thumbnail_data_url,
         "stream_id": stream_id
     }
 
 
+@router.get("/{stream_id}/thumbnail")
+async def get_thumbnail(
+    stream_id: str,
+    _=Depends(require_auth)
+):
+    """Get the latest stored thumbnail as a JPEG image."""
+    stream = await db.get_stream(stream_id)
+    if not stream:
+        raise HTTPException(status_code=404, detail="Stream not found")
+
+    if not stream.thumbnail:
+        raise HTTPException(status_code=404, detail="No thumbnail available")
+
+    return Response(
+        content=stream.thumbnail,
+        media_type="image/jpeg",
+        headers={"Cache-Control": "private, no-cache"}
+    )
+
+
 @router.post("/batch/refresh-thumbnails")
 async def refresh_all_thumbnails(_=Depends(require_auth)):
     """Capture thumbnails for all streams (runs in background)."""
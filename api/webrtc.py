@@ -17,6 +17,7 @@ router = APIRouter(prefix="/api/webrtc", tags=["webrtc"])
 class OfferRequest(BaseModel):
     """Request for WebRTC offer."""
     stream_id: str
+    client_id: Optional[str] = None  # Generated if not provided
 
 
 class AnswerRequest(BaseModel):
@@ -24,12 +25,14 @@ class AnswerRequest(BaseModel):
     stream_id: str
     sdp: str
     type: str = "answer"
+    client_id: Optional[str] = None  # From the offer; defaults to the latest viewer
 
 
 class ICECandidateRequest(BaseModel):
     """ICE candidate from client."""
     stream_id: str
     candidate: dict
+    client_id: Optional[str] = None  # From the offer; defaults to the latest viewer
 
 
 class WebRTCStatusResponse(BaseModel):
@@ -75,7 +78,10 @@ async def create_offer(
         raise HTTPException(status_code=404, detail="Stream not found")
 
     # Create offer
-    offer = await webrtc_handler.create_offer(request.stream_id, stream.rtsp_url)
+    offer = await webrtc_handler.create_offer(
+        request.stream_id, stream.rtsp_url,
+        video_codec=stream.video_codec, client_id=request.client_id
+    )
     if not offer:
         raise HTTPException(status_code=500, detail="Failed to create WebRTC offer")
 
@@ -98,7 +104,8 @@ async def handle_answer(
     success = await webrtc_handler.handle_answer(
         request.stream_id,
         request.sdp,
-        request.type
+        request.type,
+        client_id=request.client_id
     )
 
     if not success:
@@ -118,7 +125,8 @@ async def handle_ice_candidate(
 
     success = await webrtc_handler.handle_ice_candidate(
         request.stream_id,
-        request.candidate
+        request.candidate,
+        client_id=request.client_id
     )
 
     if not success:
@@ -160,7 +168,7 @@ async def webrtc_signaling(websocket: WebSocket, stream_id: str):
 
     Protocol:
     - Client connects
-    - Server sends offer: {"type": "offer", "sdp": "..."}
+    - Server sends offer: {"type": "offer", "client_id": "...", "sdp": "..."}
     - Client sends answer: {"type": "answer", "sdp": "..."}
     - Both exchange ICE candidates: {"type": "ice-candidate", "candidate": {...}}
     """
@@ -169,6 +177,7 @@ async def webrtc_signaling(websocket: WebSocket, stream_id: str):
         return
 
     await websocket.accept()
+    client_id = None
 
     try:
         # Get stream info
@@ -179,8 +188,11 @@ async def webrtc_signaling(websocket: WebSocket, stream_id: str):
             return
 
         # Create and send offer
-        offer = await webrtc_handler.create_offer(stream_id, stream.rtsp_url)
+        offer = await webrtc_handler.create_offer(
+            stream_id, stream.rtsp_url, video_codec=stream.video_codec
+        )
         if offer:
+            client_id = offer["client_id"]
             await websocket.send_json({"type": "offer", **offer})
         else:
             await websocket.send_json({"type": "error", "message": "Failed to create offer"})
@@ -196,7 +208,8 @@ async def webrtc_signaling(websocket: WebSocket, stream_id: str):
                 success = await webrtc_handler.handle_answer(
                     stream_id,
                     data.get("sdp"),
-                    "answer"
+                    "answer",
+                    client_id=client_id
                 )
                 await websocket.send_json({
                     "type": "answer-result",
@@ -208,7 +221,8 @@ async def webrtc_signaling(websocket: WebSocket, stream_id: str):
                 if candidate:
                     success = await webrtc_handler.handle_ice_candidate(
                         stream_id,
-                        candidate
+                        candidate,
+                        client_id=client_id
                     )
                     # ICE candidates don't need acknowledgment
 
@@ -220,4 +234,6 @@ async def webrtc_signaling(websocket: WebSocket, stream_id: str):
     except Exception as e:
         logger.exception(f"WebRTC WebSocket error: {e}")
     finally:
-        await webrtc_handler.stop_stream(stream_id)
+        # Only this viewer's connection; others may share the stream
+        if client_id:
+            await webrtc_handler.close_connection(stream_id, client_id)
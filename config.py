@@ -32,6 +32,7 @@ class Settings(BaseSettings):
     hls_time: int = 2  # Segment duration in seconds
     hls_list_size: int = 5  # Number of segments in playlist
     hls_delete_segments: bool = True  # Delete old segments
+    hls_accel_redirect: Optional[str] = None  # nginx internal location for segments, e.g. "/hls-internal"
 
     # Stream defaults
     default_mode: str = "on_demand"  # "always_on", "on_demand", "smart"
@@ -2,8 +2,10 @@
 
 import json
 import logging
+import shutil
 from dataclasses import dataclass, field
 from pathlib import Path
+from functools import lru_cache
 from typing import List, Optional, Dict, Any
 
 from config import settings
@@ -13,6 +15,18 @@ from core.stream_analyzer import StreamInfo
 logger = logging.getLogger(__name__)
 
 
+@lru_cache(maxsize=None)
+def resolve_executable(name: str) -> str:
+    """
+    Resolve an executable to an absolute path once.
+
+    subprocess only takes the posix_spawn() fast path for executables given
+    with a directory component, so bare names like "ffmpeg" are looked up
+    on PATH here instead of in every child.
+    """
+    return shutil.which(name) or name
+
+
 @dataclass
 class FFmpegCommand:
     """Represents an FFmpeg command with all its parts."""
@@ -25,7 +39,7 @@ class FFmpegCommand:
 
     def build(self) -> List[str]:
         """Build complete FFmpeg command."""
-        cmd = [settings.ffmpeg_path]
+        cmd = [resolve_executable(settings.ffmpeg_path)]
         cmd.extend(self.input_args)
         cmd.extend(["-i", self.input_url])
         cmd.extend(self.video_args)
@@ -58,7 +72,7 @@ class FFmpegBuilder:
         Args:
             stream: Stream database model
             stream_info: Optional analyzed stream info
-            output_dir: Output directory for HLS files
+            output_dir: Output directory for HLS files (created by the caller)
 
         Returns:
             FFmpegCommand object
@@ -87,13 +101,13 @@ class FFmpegBuilder:
         # Audio arguments
         cmd.audio_args = self._build_audio_args(stream, stream_info, overrides)
 
-        # Output arguments (HLS specific)
-        cmd.output_args = self._build_output_args(overrides, low_latency)
-
         # Output path
         if output_dir is None:
             output_dir = settings.streams_dir / str(stream.id)
-        output_dir.mkdir(parents=True, exist_ok=True)
+
+        # Output arguments (HLS specific)
+        cmd.output_args = self._build_output_args(overrides, output_dir, low_latency)
+
         cmd.output_path = str(output_dir / "stream.m3u8")
 
         logger.info(f"Built FFmpeg command: {cmd.to_string()}")
@@ -256,7 +270,12 @@ class FFmpegBuilder:
 
         return args
 
-    def _build_output_args(self, overrides: Dict[str, Any], low_latency: bool = False) -> List[str]:
+    def _build_output_args(
+        self,
+        overrides: Dict[str, Any],
+        output_dir: Path,
+        low_latency: bool = False
+    ) -> List[str]:
         """Build HLS output arguments."""
         args = []
 
@@ -286,8 +305,8 @@ class FFmpegBuilder:
         # Note: -force_key_frames is added in _build_video_args when transcoding
         # For copy mode, we rely on source keyframes (GOP)
 
-        # Segment filename pattern
-        args.extend(["-hls_segment_filename", "%d/segment_%03d.ts"])
+        # Segment filename pattern (resolved against the stream's output directory)
+        args.extend(["-hls_segment_filename", str(output_dir / "segment_%03d.ts")])
 
         # Start number
         args.extend(["-start_number", "0"])
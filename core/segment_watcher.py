@@ -0,0 +1,134 @@
+"""Watch HLS output directories for finished segments using inotify."""
+
+import asyncio
+import logging
+from pathlib import Path
+from typing import Callable, Dict, Optional
+
+try:
+    from asyncinotify import Inotify, Mask
+    INOTIFY_AVAILABLE = True
+except (ImportError, OSError, AttributeError):
+    # Not installed, or not on Linux
+    INOTIFY_AVAILABLE = False
+
+logger = logging.getLogger(__name__)
+
+
+class SegmentWatcher:
+    """
+    Tracks the newest .ts segment per stream from inotify events.
+
+    One inotify instance is shared by all streams, with a watch per
+    stream output directory. Each finished segment is reported through the
+    on_segment callback as (stream_id, segment_path), and each playlist
+    write through the optional on_playlist callback with the same arguments.
+    """
+
+    def __init__(self):
+        self._inotify: Optional[object] = None  # Inotify
+        self._task: Optional[asyncio.Task] = None
+        self._watches: Dict[str, object] = {}  # stream_id -> Watch
+        self._stream_ids: Dict[object, str] = {}  # Watch -> stream_id
+        self._on_segment: Optional[Callable[[str, str], None]] = None
+        self._on_playlist: Optional[Callable[[str, str], None]] = None
+
+    @property
+    def available(self) -> bool:
+        return self._inotify is not None
+
+    def is_watching(self, stream_id: str) -> bool:
+        """Whether a stream's output directory currently has a watch."""
+        return stream_id in self._watches
+
+    def start(
+        self,
+        on_segment: Callable[[str, str], None],
+        on_playlist: Optional[Callable[[str, str], None]] = None,
+    ):
+        """Start watching for segment and playlist events."""
+        if not INOTIFY_AVAILABLE:
+            logger.info("inotify not available, thumbnails will scan segment directories")
+            return
+        if self._inotify is not None:
+            return
+
+        try:
+            self._inotify = Inotify()
+        except OSError as e:
+            logger.warning(f"Failed to initialize inotify: {e}")
+            return
+
+        self._on_segment = on_segment
+        self._on_playlist = on_playlist
+        self._task = asyncio.create_task(self._read_events())
+
+    async def stop(self):
+        """Stop watching and release the inotify instance."""
+        if self._task:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+        if self._inotify is not None:
+            self._inotify.close()
+            self._inotify = None
+
+        self._watches.clear()
+        self._stream_ids.clear()
+
+    def watch(self, stream_id: str, directory: Path) -> bool:
+        """Watch a stream's output directory. Returns False if not watching."""
+        if self._inotify is None:
+            return False
+
+        self.unwatch(stream_id)
+        try:
+            watch = self._inotify.add_watch(directory, Mask.CLOSE_WRITE | Mask.MOVED_TO)
+        except OSError as e:
+            logger.debug(f"Failed to watch {directory}: {e}")
+            return False
+
+        self._watches[stream_id] = watch
+        self._stream_ids[watch] = stream_id
+        return True
+
+    def unwatch(self, stream_id: str):
+        """Stop watching a stream's output directory."""
+        watch = self._watches.pop(stream_id, None)
+        if watch is None:
+            return
+
+        self._stream_ids.pop(watch, None)
+        try:
+            self._inotify.rm_watch(watch)
+        except Exception:
+            pass  # Directory already removed (watch dropped by the kernel)
+
+    async def _read_events(self):
+        """Dispatch finished-segment and playlist events to the callbacks."""
+        async for event in self._inotify:
+            if event.name is None:
+                continue
+            if event.name.suffix == ".ts":
+                callback = self._on_segment
+            elif event.name.suffix == ".m3u8" and self._on_playlist is not None:
+                callback = self._on_playlist
+            else:
+                continue
+
+            stream_id = self._stream_ids.get(event.watch)
+            if stream_id is None:
+                continue
+
+            try:
+                callback(stream_id, str(event.path))
+            except Exception as e:
+                logger.debug(f"Segment callback failed for {stream_id}: {e}")
+
+
+# Global segment watcher instance
+segment_watcher = SegmentWatcher()
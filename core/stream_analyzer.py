@@ -35,7 +35,6 @@ class StreamInfo:
     # Stream info
     is_valid: bool = False
     error: Optional[str] = None
-    raw_data: Optional[Dict[str, Any]] = None
 
     # Recommendations
     can_copy_video: bool = False
@@ -148,7 +147,6 @@ class StreamAnalyzer:
 
             try:
                 data = json.loads(stdout_text)
-                info.raw_data = data
             except json.JSONDecodeError as e:
                 logger.error(f"JSON parse error: {e}, stdout: {stdout_text[:500]}")
                 info.error = f"Failed to parse stream info: {e}"
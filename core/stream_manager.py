@@ -2,11 +2,15 @@
 
 import asyncio
 import logging
+import os
+import re
 import shutil
 import signal
-from datetime import datetime, timedelta
+import time
+from collections import OrderedDict, deque
+from datetime import datetime
 from pathlib import Path
-from typing import Dict, Optional, Set
+from typing import Any, Deque, Dict, List, Optional, Set, Tuple
 from dataclasses import dataclass, field
 
 from config import settings
@@ -14,9 +18,96 @@ from database import db, Stream, StreamStatus, StreamMode
 from core.stream_analyzer import analyzer, StreamInfo
 from core.ffmpeg_builder import ffmpeg_builder
 from core.thumbnail import capture_thumbnail, capture_thumbnail_from_hls
+from core.segment_watcher import segment_watcher
 
 logger = logging.getLogger(__name__)
 
+# FFmpeg error classifier, in priority order: (pattern, user-friendly message)
+_ERROR_PATTERNS = [
+    (r"connection refused", "Connection refused - camera offline or port blocked"),
+    (r"401|unauthorized", "Authentication failed - check RTSP credentials"),
+    (r"404|not found", "Stream not found - check RTSP URL path"),
+    (r"timeout", "Connection timeout - network issue or camera offline"),
+    (r"no route", "No route to host - check network/IP address"),
+    (r"invalid data", "Invalid stream data - incompatible format"),
+    (r"codec not currently supported", "Codec not supported - try enabling transcoding"),
+]
+_ERROR_ALT = re.compile(
+    "|".join(f"(?P<g{i}>{pattern})" for i, (pattern, _) in enumerate(_ERROR_PATTERNS)),
+    re.IGNORECASE
+)
+
+# HLS segment names written by FFmpeg (segment_%03d.ts; grows past 3 digits)
+_SEGMENT_NAME_RE = re.compile(r"segment_\d{3,}\.ts")
+
+
+def _fast_rmdir(path: str):
+    """Remove a flat stream directory with one scandir pass (blocking)."""
+    try:
+        with os.scandir(path) as entries:
+            for entry in entries:
+                try:
+                    if entry.is_dir(follow_symlinks=False):
+                        # Not expected in stream dirs, but don't leave it behind
+                        shutil.rmtree(entry.path, ignore_errors=True)
+                    else:
+                        os.unlink(entry.path)
+                except OSError:
+                    pass
+        os.rmdir(path)
+    except OSError:
+        pass  # Already removed or not empty
+
+
+def _cleanup_segments_sync(
+    streams_dir: Path,
+    max_age_seconds: float,
+    known_stream_ids: Set[str],
+    db_stream_ids: Set[str]
+) -> Tuple[int, List[str]]:
+    """
+    Delete old .ts segments and orphaned stream directories.
+
+    Blocking; run in a worker thread. A directory is orphaned when its stream
+    is neither running (known_stream_ids) nor in the database (db_stream_ids).
+
+    Returns the number of segment files deleted and the orphaned directories removed.
+    """
+    if not streams_dir.exists():
+        return 0, []
+
+    now = time.time()
+    deleted_count = 0
+    orphaned_dirs = []
+
+    with os.scandir(streams_dir) as stream_dirs:
+        for stream_dir in stream_dirs:
+            if not stream_dir.is_dir():
+                continue
+
+            # Orphaned directory (deleted stream)
+            if stream_dir.name not in known_stream_ids and stream_dir.name not in db_stream_ids:
+                _fast_rmdir(stream_dir.path)
+                orphaned_dirs.append(stream_dir.path)
+                continue
+
+            # Delete old .ts segment files
+            try:
+                with os.scandir(stream_dir.path) as entries:
+                    for entry in entries:
+                        if not entry.name.endswith(".ts"):
+                            continue
+                        try:
+                            if now - entry.stat(follow_symlinks=False).st_mtime > max_age_seconds:
+                                os.unlink(entry.path)
+                                deleted_count += 1
+                        except OSError:
+                            pass
+            except OSError:
+                pass  # Directory removed while scanning
+
+    return deleted_count, orphaned_dirs
+
 
 @dataclass
 class StreamProcess:
@@ -24,35 +115,65 @@ class StreamProcess:
     stream_id: str
     process: Optional[asyncio.subprocess.Process] = None
     task: Optional[asyncio.Task] = None
-    start_time: Optional[datetime] = None
-    last_viewer_time: Optional[datetime] = None
+    start_time: Optional[float] = None  # time.monotonic() at FFmpeg start
+    start_wallclock: Optional[datetime] = None  # Wall-clock start time for status output
+    last_viewer_time: Optional[float] = None  # time.monotonic() of last viewer activity
     viewer_count: int = 0
+    last_persisted_count: Optional[int] = None  # Viewer count last written to the database
     viewers: Set[str] = field(default_factory=set)  # Track viewer IDs
     stream_info: Optional[StreamInfo] = None
+    mode: Optional[str] = None  # StreamMode value, cached at FFmpeg start
     keep_alive_task: Optional[asyncio.Task] = None
     reconnect_count: int = 0
+    latest_segment: Optional[str] = None  # Newest finished .ts file (from inotify)
+    playlist_ready: asyncio.Event = field(default_factory=asyncio.Event)  # Set once FFmpeg writes the playlist
+    stderr_tail: Deque[bytes] = field(default_factory=lambda: deque(maxlen=16))  # Last FFmpeg stderr lines
 
 
 class StreamManager:
     """Manages FFmpeg streaming processes."""
 
+    # Seconds between thumbnail updates for running streams
+    THUMBNAIL_INTERVAL = 60
+    # Max FFmpeg thumbnail captures running at once during an update pass
+    THUMBNAIL_CONCURRENCY = 4
+
     def __init__(self):
-        self._processes: Dict[str, StreamProcess] = {}
+        # Insertion order == start order, so the first key is the oldest stream (FIFO)
+        self._processes: "OrderedDict[str, StreamProcess]" = OrderedDict()
         self._lock = asyncio.Lock()
-        self._cleanup_task: Optional[asyncio.Task] = None
-        self._thumbnail_task: Optional[asyncio.Task] = None
+        self._starting: Dict[str, asyncio.Event] = {}  # stream_id -> set when its start attempt finishes
+        self._maintenance_task: Optional[asyncio.Task] = None
+        self._viewer_flush_task: Optional[asyncio.Task] = None
+        self._dirty_viewers: Set[str] = set()  # Streams with unpersisted viewer counts
+        self._rts_cache: Optional[Tuple[float, Dict[str, Any]]] = None  # (monotonic ts, settings)
         self._running = False
 
     async def start(self):
         """Start the stream manager."""
         self._running = True
-        self._cleanup_task = asyncio.create_task(self._cleanup_loop())
-        self._thumbnail_task = asyncio.create_task(self._thumbnail_loop())
+        segment_watcher.start(self._on_segment, self._on_playlist)
+        self._maintenance_task = asyncio.create_task(self._maintenance_loop())
+        self._viewer_flush_task = asyncio.create_task(self._viewer_flush_loop())
 
-        # Start all always-on streams
+        # Start all always-on streams concurrently, up to the concurrency limit
+        # (they would otherwise evict each other through FIFO)
         streams = await db.get_always_on_streams()
-        for stream in streams:
-            await self.start_stream(stream.id)
+        max_concurrent = (await self._runtime_settings())['max_concurrent_streams']
+        if len(streams) > max_concurrent:
+            logger.warning(
+                f"{len(streams)} always-on streams exceed max concurrent streams "
+                f"({max_concurrent}); starting the first {max_concurrent}"
+            )
+            streams = streams[:max_concurrent]
+
+        results = await asyncio.gather(
+            *(self.start_stream(stream.id) for stream in streams),
+            return_exceptions=True
+        )
+        for stream, result in zip(streams, results):
+            if isinstance(result, BaseException):
+                logger.error(f"Failed to start always-on stream {stream.id}: {result}")
 
         logger.info("Stream manager started")
 
@@ -60,17 +181,17 @@ class StreamManager:
         """Stop all streams and cleanup."""
         self._running = False
 
-        if self._cleanup_task:
-            self._cleanup_task.cancel()
+        if self._maintenance_task:
+            self._maintenance_task.cancel()
             try:
-                await self._cleanup_task
+                await self._maintenance_task
             except asyncio.CancelledError:
                 pass
 
-        if self._thumbnail_task:
-            self._thumbnail_task.cancel()
+        if self._viewer_flush_task:
+            self._viewer_flush_task.cancel()
             try:
-                await self._thumbnail_task
+                await self._viewer_flush_task
             except asyncio.CancelledError:
                 pass
 
@@ -79,20 +200,27 @@ class StreamManager:
         for stream_id in stream_ids:
             await self.stop_stream(stream_id)
 
+        # Persist any viewer counts still pending
+        await self._flush_viewer_counts()
+
+        await segment_watcher.stop()
+
         logger.info("Stream manager stopped")
 
-    def _get_oldest_stream_id(self) -> Optional[str]:
-        """Get the stream ID with the oldest start time (FIFO)."""
-        oldest_id = None
-        oldest_time = None
+    async def _runtime_settings(self) -> Dict[str, Any]:
+        """Get runtime settings, cached for a few seconds to avoid a DB hit per call."""
+        if self._rts_cache:
+            cached_at, cached = self._rts_cache
+            if time.monotonic() - cached_at < 5.0:
+                return cached
 
-        for sid, proc in self._processes.items():
-            if proc.start_time:
-                if oldest_time is None or proc.start_time < oldest_time:
-                    oldest_time = proc.start_time
-                    oldest_id = sid
+        runtime_settings = await db.get_runtime_settings()
+        self._rts_cache = (time.monotonic(), runtime_settings)
+        return runtime_settings
 
-        return oldest_id
+    def invalidate_runtime_settings(self):
+        """Drop cached runtime settings (call after settings are changed)."""
+        self._rts_cache = None
 
     async def start_stream(self, stream_id: str, viewer_id: str = None) -> bool:
         """
@@ -107,25 +235,30 @@ class StreamManager:
         """
         # Check if we need to stop oldest stream (FIFO) before acquiring lock
         stream_to_stop = None
+        starting = None
 
         async with self._lock:
             # Check if already running
             if stream_id in self._processes:
-                proc = self._processes[stream_id]
-                if viewer_id:
-                    proc.viewers.add(viewer_id)
-                    proc.viewer_count = len(proc.viewers)
-                    proc.last_viewer_time = datetime.utcnow()
-                    await db.update_viewer_count(stream_id, proc.viewer_count)
-                return True
-
-            # Check max concurrent streams limit (FIFO eviction)
-            runtime_settings = await db.get_runtime_settings()
-            max_concurrent = runtime_settings['max_concurrent_streams']
-            if len(self._processes) >= max_concurrent:
-                stream_to_stop = self._get_oldest_stream_id()
-                if stream_to_stop:
-                    logger.info(f"Max concurrent streams ({max_concurrent}) reached. Stopping oldest stream: {stream_to_stop}")
+                self._add_viewer(self._processes[stream_id], viewer_id)
+                starting = self._starting.get(stream_id)
+                if starting is None:
+                    return True
+            else:
+                # Check max concurrent streams limit (FIFO eviction)
+                runtime_settings = await self._runtime_settings()
+                max_concurrent = runtime_settings['max_concurrent_streams']
+                if len(self._processes) >= max_concurrent:
+                    # Evict the oldest stream that is actually running, not one still launching
+                    stream_to_stop = next(
+                        (sid for sid, p in self._processes.items() if p.process is not None),
+                        next(iter(self._processes), None)
+                    )
+                    if stream_to_stop:
+                        logger.info(f"Max concurrent streams ({max_concurrent}) reached. Stopping oldest stream: {stream_to_stop}")
+
+        if starting is not None:
+            return await self._wait_for_start(stream_id, starting)
 
         # Stop oldest stream outside lock to avoid deadlock
         if stream_to_stop:
@@ -134,88 +267,128 @@ class StreamManager:
         async with self._lock:
             # Re-check if already running (might have changed)
             if stream_id in self._processes:
-                return True
+                self._add_viewer(self._processes[stream_id], viewer_id)
+                starting = self._starting.get(stream_id)
+                if starting is None:
+                    return True
+            else:
+                # Get stream from database
+                stream = await db.get_stream(stream_id)
+                if not stream:
+                    logger.error(f"Stream {stream_id} not found")
+                    return False
 
-            # Get stream from database
-            stream = await db.get_stream(stream_id)
-            if not stream:
-                logger.error(f"Stream {stream_id} not found")
-                return False
+                # Update status to starting
+                await db.update_stream_status(stream_id, StreamStatus.STARTING)
 
-            # Update status to starting
-            await db.update_stream_status(stream_id, StreamStatus.STARTING)
-
-            # Create stream process holder
-            proc = StreamProcess(stream_id=stream_id)
-            if viewer_id:
-                proc.viewers.add(viewer_id)
-                proc.viewer_count = 1
-            proc.last_viewer_time = datetime.utcnow()
-
-            # Analyze stream if we don't have info
-            if not stream.video_codec:
-                logger.info(f"Analyzing stream {stream_id}...")
-                proc.stream_info = await analyzer.analyze(stream.rtsp_url)
-
-                if not proc.stream_info.is_valid:
-                    error = proc.stream_info.error or "Failed to analyze stream"
-                    await db.update_stream_status(stream_id, StreamStatus.ERROR, error=error)
-                    logger.error(f"Stream {stream_id} analysis failed: {error}")
-                    return False
+                # Create stream process holder
+                proc = StreamProcess(stream_id=stream_id)
+                if viewer_id:
+                    proc.viewers.add(viewer_id)
+                    proc.viewer_count = 1
+                proc.last_viewer_time = time.monotonic()
+
+                self._processes[stream_id] = proc
+                # Concurrent requests for this stream wait for this attempt
+                started = self._starting[stream_id] = asyncio.Event()
+
+        if starting is not None:
+            return await self._wait_for_start(stream_id, starting)
+
+        try:
+            return await self._launch(stream_id, stream, proc)
+        finally:
+            if self._starting.get(stream_id) is started:
+                del self._starting[stream_id]
+            started.set()
+
+    def _add_viewer(self, proc: StreamProcess, viewer_id: Optional[str]):
+        """Register a viewer on an already running (or starting) stream."""
+        if viewer_id:
+            proc.viewers.add(viewer_id)
+            proc.viewer_count = len(proc.viewers)
+            proc.last_viewer_time = time.monotonic()
+            self._mark_viewers_dirty(proc)
 
-                # Update stream with detected info
-                stream.video_codec = proc.stream_info.video_codec
-                stream.audio_codec = proc.stream_info.audio_codec
-                stream.resolution = proc.stream_info.resolution
-                stream.framerate = proc.stream_info.framerate
-                stream.bitrate = proc.stream_info.video_bitrate
-                await db.update_stream(stream)
+    async def _wait_for_start(self, stream_id: str, starting: asyncio.Event) -> bool:
+        """Wait for another request's start attempt and report whether it succeeded."""
+        await starting.wait()
+        return stream_id in self._processes
+
+    async def _launch(self, stream_id: str, stream: Stream, proc: StreamProcess) -> bool:
+        """Analyze (if needed) and spawn FFmpeg for a newly registered stream."""
+        # Analyze stream if we don't have info (outside lock so starts can overlap)
+        if not stream.video_codec:
+            logger.info(f"Analyzing stream {stream_id}...")
+            proc.stream_info = await analyzer.analyze(stream.rtsp_url)
+
+            if not proc.stream_info.is_valid:
+                error = proc.stream_info.error or "Failed to analyze stream"
+                await db.update_stream_status(stream_id, StreamStatus.ERROR, error=error)
+                logger.error(f"Stream {stream_id} analysis failed: {error}")
+                async with self._lock:
+                    if self._processes.get(stream_id) is proc:
+                        self._processes.pop(stream_id)
+                return False
 
-            self._processes[stream_id] = proc
+            # Update stream with detected info
+            stream.video_codec = proc.stream_info.video_codec
+            stream.audio_codec = proc.stream_info.audio_codec
+            stream.resolution = proc.stream_info.resolution
+            stream.framerate = proc.stream_info.framerate
+            stream.bitrate = proc.stream_info.video_bitrate
+            await db.update_stream(stream)
 
         # Start FFmpeg process (outside lock to avoid blocking)
-        success = await self._start_ffmpeg(stream_id)
+        success = await self._start_ffmpeg(stream_id, stream)
 
         if success:
-            await db.update_viewer_count(stream_id, proc.viewer_count)
+            self._mark_viewers_dirty(proc)
 
         return success
 
-    async def _start_ffmpeg(self, stream_id: str) -> bool:
-        """Start the FFmpeg process for a stream."""
+    async def _start_ffmpeg(self, stream_id: str, stream: Stream) -> bool:
+        """Start the FFmpeg process for a stream already loaded from the database."""
         proc = self._processes.get(stream_id)
         if not proc:
             return False
 
-        stream = await db.get_stream(stream_id)
-        if not stream:
-            return False
-
         # Build output directory
         output_dir = settings.streams_dir / str(stream_id)
-        output_dir.mkdir(parents=True, exist_ok=True)
+        await asyncio.to_thread(output_dir.mkdir, parents=True, exist_ok=True)
+        segment_watcher.watch(stream_id, output_dir)
 
         # Build FFmpeg command
         cmd = ffmpeg_builder.build_hls_command(stream, proc.stream_info, output_dir)
-
-        # Fix segment filename to use output directory
         cmd_list = cmd.build()
-        for i, arg in enumerate(cmd_list):
-            if arg == "%d/segment_%03d.ts":
-                cmd_list[i] = str(output_dir / "segment_%03d.ts")
 
         try:
             logger.info(f"Starting FFmpeg for stream {stream_id}")
             logger.debug(f"Command: {' '.join(cmd_list)}")
 
+            # HLS output goes to files; stdout is never read.
+            # close_fds=False lets CPython use posix_spawn() (vfork+exec) instead
+            # of fork(); descriptors we open are non-inheritable (PEP 446) anyway.
             process = await asyncio.create_subprocess_exec(
                 *cmd_list,
-                stdout=asyncio.subprocess.PIPE,
+                stdout=asyncio.subprocess.DEVNULL,
                 stderr=asyncio.subprocess.PIPE,
+                close_fds=False,
             )
 
+            if self._processes.get(stream_id) is not proc:
+                # Stopped while launching; don't leave an orphaned FFmpeg behind
+                logger.info(f"Stream {stream_id} was stopped during startup")
+                process.kill()
+                await process.wait()
+                return False
+
             proc.process = process
-            proc.start_time = datetime.utcnow()
+            proc.stderr_tail.clear()
+            proc.playlist_ready.clear()
+            proc.start_time = time.monotonic()
+            proc.start_wallclock = datetime.utcnow()
+            proc.mode = stream.mode
 
             # Update database
             await db.update_stream_status(
@@ -240,7 +413,8 @@ class StreamManager:
                 stream_id, StreamStatus.ERROR, error=str(e)
             )
             async with self._lock:
-                self._processes.pop(stream_id, None)
+                if self._processes.get(stream_id) is proc:
+                    self._processes.pop(stream_id)
             return False
 
     async def _monitor_process(self, stream_id: str):
@@ -249,15 +423,19 @@ class StreamManager:
         if not proc or not proc.process:
             return
 
+        process = proc.process
+        stderr_task = asyncio.create_task(self._drain_stderr(proc, process.stderr))
+
         try:
             # Wait for process to complete
-            stdout, stderr = await proc.process.communicate()
+            exit_code = await process.wait()
+            await stderr_task
 
-            exit_code = proc.process.returncode
             logger.info(f"FFmpeg for stream {stream_id} exited with code {exit_code}")
 
             if exit_code != 0:
-                error_output = stderr.decode()[-500:] if stderr else "Unknown error"
+                stderr = b"".join(proc.stderr_tail)
+                error_output = stderr.decode(errors="replace")[-500:] if stderr else "Unknown error"
                 logger.error(f"FFmpeg error for stream {stream_id}: {error_output}")
 
                 # Check if we should reconnect
@@ -273,7 +451,7 @@ class StreamManager:
                     await asyncio.sleep(settings.reconnect_delay)
 
                     # Restart FFmpeg
-                    await self._start_ffmpeg(stream_id)
+                    await self._start_ffmpeg(stream_id, stream)
                     return
                 else:
                     await db.update_stream_status(
@@ -289,8 +467,25 @@ class StreamManager:
             logger.exception(f"Error monitoring stream {stream_id}: {e}")
             await db.update_stream_status(stream_id, StreamStatus.ERROR, error=str(e))
         finally:
-            async with self._lock:
-                self._processes.pop(stream_id, None)
+            stderr_task.cancel()
+            if proc.process is process:
+                # A reconnect may already have replaced the process
+                segment_watcher.unwatch(stream_id)
+                async with self._lock:
+                    if self._processes.get(stream_id) is proc:
+                        self._processes.pop(stream_id)
+
+    async def _drain_stderr(self, proc: StreamProcess, reader: asyncio.StreamReader):
+        """Keep only the last few lines of FFmpeg stderr instead of buffering it all."""
+        while True:
+            try:
+                line = await reader.readline()
+            except ValueError:
+                # Overlong line (e.g. \r-separated progress output); it was discarded
+                continue
+            if not line:
+                break
+            proc.stderr_tail.append(line)
 
     async def _keep_alive_checker(self, stream_id: str, keep_alive_seconds: int):
         """Check if stream should be stopped due to no viewers."""
@@ -302,8 +497,7 @@ class StreamManager:
                 break
 
             if proc.viewer_count == 0 and proc.last_viewer_time:
-                elapsed = datetime.utcnow() - proc.last_viewer_time
-                if elapsed.total_seconds() > keep_alive_seconds:
+                if time.monotonic() - proc.last_viewer_time > keep_alive_seconds:
                     logger.info(
                         f"Stream {stream_id} has no viewers for {keep_alive_seconds}s, stopping"
                     )
@@ -320,6 +514,7 @@ class StreamManager:
 
             # Remove from processes dict immediately to prevent re-entry
             self._processes.pop(stream_id, None)
+            segment_watcher.unwatch(stream_id)
 
             # Get references to tasks/process we need to clean up
             keep_alive_task = proc.keep_alive_task
@@ -382,8 +577,8 @@ class StreamManager:
         # Update viewer tracking
         proc.viewers.add(viewer_id)
         proc.viewer_count = len(proc.viewers)
-        proc.last_viewer_time = datetime.utcnow()
-        await db.update_viewer_count(stream_id, proc.viewer_count)
+        proc.last_viewer_time = time.monotonic()
+        self._mark_viewers_dirty(proc)
         return True
 
     async def viewer_disconnect(self, stream_id: str, viewer_id: str):
@@ -392,8 +587,98 @@ class StreamManager:
         if proc and viewer_id in proc.viewers:
             proc.viewers.discard(viewer_id)
             proc.viewer_count = len(proc.viewers)
-            proc.last_viewer_time = datetime.utcnow()
-            await db.update_viewer_count(stream_id, proc.viewer_count)
+            proc.last_viewer_time = time.monotonic()
+            self._mark_viewers_dirty(proc)
+
+    def _mark_viewers_dirty(self, proc: StreamProcess):
+        """Queue a viewer count write unless the database already has this count."""
+        if proc.viewer_count != proc.last_persisted_count:
+            self._dirty_viewers.add(proc.stream_id)
+
+    async def _viewer_flush_loop(self):
+        """Periodically persist coalesced viewer counts."""
+        while self._running:
+            try:
+                await asyncio.sleep(2)
+                await self._flush_viewer_counts()
+            except asyncio.CancelledError:
+                break
+            except Exception as e:
+                logger.exception(f"Error in viewer flush loop: {e}")
+
+    async def _flush_viewer_counts(self):
+        """Write viewer counts for all dirty streams in a single batch."""
+        if not self._dirty_viewers:
+            return
+
+        dirty, self._dirty_viewers = self._dirty_viewers, set()
+        counts = []
+        written = []
+        for stream_id in dirty:
+            proc = self._processes.get(stream_id)
+            if not proc:
+                counts.append((stream_id, 0))
+            elif proc.viewer_count != proc.last_persisted_count:
+                counts.append((stream_id, proc.viewer_count))
+                written.append((proc, proc.viewer_count))
+
+        if not counts:
+            return
+
+        try:
+            await db.update_viewer_counts_bulk(counts)
+        except Exception:
+            # Keep them dirty so the next flush retries
+            self._dirty_viewers.update(dirty)
+            raise
+
+        for proc, count in written:
+            proc.last_persisted_count = count
+
+    def _on_segment(self, stream_id: str, segment_path: str):
+        """Record the newest finished segment reported by the segment watcher."""
+        proc = self._processes.get(stream_id)
+        if proc:
+            proc.latest_segment = segment_path
+
+    def _on_playlist(self, stream_id: str, playlist_path: str):
+        """Wake requests waiting for a starting stream's playlist."""
+        proc = self._processes.get(stream_id)
+        if proc:
+            proc.playlist_ready.set()
+
+    async def wait_for_playlist(self, stream_id: str, timeout: float) -> bool:
+        """
+        Wait for a starting stream to write its playlist.
+
+        Args:
+            stream_id: Stream ID
+            timeout: Max seconds to wait
+
+        Returns:
+            True if the playlist exists
+        """
+        playlist = settings.streams_dir / stream_id / "stream.m3u8"
+        if playlist.exists():
+            return True
+        proc = self._processes.get(stream_id)
+        if proc is None:
+            return False
+
+        if not segment_watcher.is_watching(stream_id):
+            # No inotify events for this directory (unavailable or watch failed), poll instead
+            deadline = time.monotonic() + timeout
+            while time.monotonic() < deadline:
+                await asyncio.sleep(0.5)
+                if playlist.exists():
+                    return True
+            return False
+
+        try:
+            await asyncio.wait_for(proc.playlist_ready.wait(), timeout=timeout)
+        except asyncio.TimeoutError:
+            pass
+        return playlist.exists()
 
     def get_stream_status(self, stream_id: str) -> dict:
         """Get current stream status."""
@@ -404,83 +689,117 @@ class StreamManager:
                 "status": "stopped",
                 "viewer_count": 0
             }
+        if proc.process is None:
+            # Registered but still being analyzed / spawned
+            return {
+                "running": False,
+                "status": "starting",
+                "viewer_count": proc.viewer_count
+            }
 
         return {
             "running": True,
             "status": "running",
             "viewer_count": proc.viewer_count,
-            "start_time": proc.start_time.isoformat() if proc.start_time else None,
+            "start_time": proc.start_wallclock.isoformat() if proc.start_wallclock else None,
             "pid": proc.process.pid if proc.process else None,
             "reconnect_count": proc.reconnect_count
         }
 
     def is_running(self, stream_id: str) -> bool:
-        """Check if a stream is currently running."""
-        return stream_id in self._processes
+        """Check if a stream's FFmpeg process has been spawned (False while still starting)."""
+        return self._running_process(stream_id) is not None
+
+    def _running_process(self, stream_id: str) -> Optional[StreamProcess]:
+        """Get a stream's holder once FFmpeg is spawned; None if stopped or still starting."""
+        proc = self._processes.get(stream_id)
+        if proc is None or proc.process is None:
+            return None
+        return proc
+
+    def segment_path(self, stream_id: str, filename: str) -> Optional[Path]:
+        """
+        Get the on-disk path of an HLS segment of a running stream.
+
+        Args:
+            stream_id: Stream ID
+            filename: Segment file name as requested by the player
+
+        Returns:
+            Path to the segment, or None if the name is not a segment name
+            or the stream is not running
+        """
+        if self._running_process(stream_id) is None or not _SEGMENT_NAME_RE.fullmatch(filename):
+            return None
+        return settings.streams_dir / stream_id / filename
+
+    async def _maintenance_loop(self):
+        """
+        Run periodic segment cleanup and thumbnail updates from one task.
+
+        Each job keeps its own monotonic deadline; the loop sleeps until the
+        earliest one and runs whichever jobs are due.
+        """
+        now = time.monotonic()
+        next_cleanup = now + settings.segment_cleanup_interval
+        next_thumbnail = now + self.THUMBNAIL_INTERVAL
 
-    async def _cleanup_loop(self):
-        """Periodically cleanup old HLS segments."""
         while self._running:
             try:
-                await asyncio.sleep(settings.segment_cleanup_interval)
-                await self._cleanup_segments()
+                delay = min(next_cleanup, next_thumbnail) - time.monotonic()
+                if delay > 0:
+                    await asyncio.sleep(delay)
+
+                now = time.monotonic()
+                if now >= next_cleanup:
+                    next_cleanup = now + settings.segment_cleanup_interval
+                    try:
+                        await self._cleanup_segments()
+                    except Exception as e:
+                        logger.exception(f"Error in segment cleanup: {e}")
+
+                if now >= next_thumbnail:
+                    next_thumbnail = now + self.THUMBNAIL_INTERVAL
+                    try:
+                        await self._update_thumbnails()
+                    except Exception as e:
+                        logger.exception(f"Error updating thumbnails: {e}")
             except asyncio.CancelledError:
                 break
-            except Exception as e:
-                logger.exception(f"Error in cleanup loop: {e}")
 
     async def _cleanup_segments(self):
         """Remove old HLS segments (older than segment_max_age_minutes)."""
-        import time
-        runtime_settings = await db.get_runtime_settings()
+        runtime_settings = await self._runtime_settings()
         max_age_seconds = runtime_settings['segment_max_age_minutes'] * 60
-        now = time.time()
-        deleted_count = 0
 
-        if not settings.streams_dir.exists():
-            return
+        # Fetch known stream IDs up front, then do all filesystem work in a thread
+        db_stream_ids = await db.get_all_stream_ids()
+        deleted_count, orphaned_dirs = await asyncio.to_thread(
+            _cleanup_segments_sync,
+            settings.streams_dir,
+            max_age_seconds,
+            set(self._processes),
+            db_stream_ids
+        )
 
-        for stream_dir in settings.streams_dir.iterdir():
-            if stream_dir.is_dir():
-                # Delete old .ts segment files
-                for ts_file in stream_dir.glob("*.ts"):
-                    try:
-                        file_age = now - ts_file.stat().st_mtime
-                        if file_age > max_age_seconds:
-                            ts_file.unlink()
-                            deleted_count += 1
-                    except Exception:
-                        pass
-
-                # Also clean orphaned directories (deleted streams)
-                stream_id = stream_dir.name
-                if stream_id not in self._processes:
-                    stream = await db.get_stream(stream_id)
-                    if not stream:
-                        shutil.rmtree(stream_dir)
-                        logger.info(f"Cleaned up orphaned stream directory: {stream_dir}")
+        for stream_dir in orphaned_dirs:
+            logger.info(f"Cleaned up orphaned stream directory: {stream_dir}")
 
         if deleted_count > 0:
             logger.debug(f"Cleaned up {deleted_count} old segment files")
 
     def _parse_ffmpeg_error(self, error_output: str) -> str:
         """Parse FFmpeg error output to user-friendly message."""
-        error_lower = error_output.lower()
-
-        if "connection refused" in error_lower:
-            return "Connection refused - camera offline or port blocked"
-        elif "401" in error_lower or "unauthorized" in error_lower:
-            return "Authentication failed - check RTSP credentials"
-        elif "404" in error_lower or "not found" in error_lower:
-            return "Stream not found - check RTSP URL path"
-        elif "timeout" in error_lower:
-            return "Connection timeout - network issue or camera offline"
-        elif "no route" in error_lower:
-            return "No route to host - check network/IP address"
-        elif "invalid data" in error_lower:
-            return "Invalid stream data - incompatible format"
-        elif "codec not currently supported" in error_lower:
-            return "Codec not supported - try enabling transcoding"
+        # Single pass over the output; keep the highest-priority match found
+        best = None
+        for match in _ERROR_ALT.finditer(error_output):
+            index = int(match.lastgroup[1:])
+            if best is None or index < best:
+                best = index
+                if best == 0:
+                    break
+        if best is not None:
+            return _ERROR_PATTERNS[best][1]
 
         # Return last line of error
         lines = [l.strip() for l in error_output.strip().split("\n") if l.strip()]
@@ -488,30 +807,39 @@ class StreamManager:
             return lines[-1][:200]
         return "Unknown error occurred"
 
-    async def _thumbnail_loop(self):
-        """Periodically update thumbnails for running streams."""
-        while self._running:
-            try:
-                await asyncio.sleep(60)  # Update every 60 seconds
-                await self._update_thumbnails()
-            except asyncio.CancelledError:
-                break
-            except Exception as e:
-                logger.exception(f"Error in thumbnail loop: {e}")
-
     async def _update_thumbnails(self):
-        """Update thumbnails for all running streams."""
-        for stream_id in list(self._processes.keys()):
+        """Update thumbnails for running streams that are watched or always on."""
+        # Nobody sees the thumbnail of an idle on-demand stream in its grace period
+        procs = [
+            proc for proc in self._processes.values()
+            if proc.process is not None
+            and (proc.viewer_count > 0 or proc.mode == StreamMode.ALWAYS_ON.value)
+        ]
+        stream_ids = [proc.stream_id for proc in procs]
+        semaphore = asyncio.Semaphore(self.THUMBNAIL_CONCURRENCY)
+
+        async def capture(proc: StreamProcess) -> Optional[bytes]:
+            async with semaphore:
+                return await capture_thumbnail_from_hls(proc.stream_id, segment=proc.latest_segment)
+
+        # Submit all captures at once; the semaphore bounds how many run concurrently
+        results = await asyncio.gather(
+            *(capture(proc) for proc in procs),
+            return_exceptions=True
+        )
+
+        for stream_id, thumbnail in zip(stream_ids, results):
+            if isinstance(thumbnail, BaseException):
+                logger.debug(f"Failed to update thumbnail for {stream_id}: {thumbnail}")
+                continue
             try:
-                # Try to capture from HLS segments first (faster)
-                thumbnail = await capture_thumbnail_from_hls(stream_id)
                 if thumbnail:
                     await db.update_stream_thumbnail(stream_id, thumbnail)
                     logger.debug(f"Updated thumbnail for stream {stream_id}")
             except Exception as e:
                 logger.debug(f"Failed to update thumbnail for {stream_id}: {e}")
 
-    async def capture_stream_thumbnail(self, stream_id: str) -> Optional[str]:
+    async def capture_stream_thumbnail(self, stream_id: str) -> Optional[bytes]:
         """
         Capture a thumbnail for a specific stream.
 
@@ -519,11 +847,12 @@ class StreamManager:
             stream_id: Stream ID
 
         Returns:
-            Base64 encoded thumbnail or None
+            Raw JPEG thumbnail bytes or None
         """
         # First try HLS if stream is running
-        if stream_id in self._processes:
-            thumbnail = await capture_thumbnail_from_hls(stream_id)
+        proc = self._running_process(stream_id)
+        if proc:
+            thumbnail = await capture_thumbnail_from_hls(stream_id, segment=proc.latest_segment)
             if thumbnail:
                 await db.update_stream_thumbnail(stream_id, thumbnail)
                 return thumbnail
@@ -1,7 +1,6 @@
 """Thumbnail capture utility using FFmpeg."""
 
 import asyncio
-import base64
 import logging
 from pathlib import Path
 from typing import Optional
@@ -11,7 +10,7 @@ from config import settings
 logger = logging.getLogger(__name__)
 
 
-async def capture_thumbnail(rtsp_url: str, width: int = 320, height: int = 180, timeout: int = 10) -> Optional[str]:
+async def capture_thumbnail(rtsp_url: str, width: int = 320, height: int = 180, timeout: int = 10) -> Optional[bytes]:
     """
     Capture a thumbnail from an RTSP stream.
 
@@ -22,7 +21,7 @@ async def capture_thumbnail(rtsp_url: str, width: int = 320, height: int = 180,
         timeout: Timeout in seconds
 
     Returns:
-        Base64 encoded JPEG image or None on failure
+        Raw JPEG bytes or None on failure
     """
     try:
         # FFmpeg command to capture a single frame as JPEG
@@ -52,9 +51,7 @@ async def capture_thumbnail(rtsp_url: str, width: int = 320, height: int = 180,
             )
 
             if process.returncode == 0 and stdout:
-                # Encode as base64
-                thumbnail = base64.b64encode(stdout).decode('utf-8')
-                return f"data:image/jpeg;base64,{thumbnail}"
+                return stdout
             else:
                 logger.warning(f"Failed to capture thumbnail: {stderr.decode()[-200:]}")
                 return None
@@ -70,7 +67,12 @@ async def capture_thumbnail(rtsp_url: str, width: int = 320, height: int = 180,
         return None
 
 
-async def capture_thumbnail_from_hls(stream_id: str, width: int = 320, height: int = 180) -> Optional[str]:
+async def capture_thumbnail_from_hls(
+    stream_id: str,
+    width: int = 320,
+    height: int = 180,
+    segment: Optional[str] = None
+) -> Optional[bytes]:
     """
     Capture a thumbnail from an existing HLS stream.
 
@@ -78,22 +80,26 @@ async def capture_thumbnail_from_hls(stream_id: str, width: int = 320, height: i
         stream_id: Stream ID
         width: Thumbnail width
         height: Thumbnail height
+        segment: Path of the latest segment if already known (skips the directory scan)
 
     Returns:
-        Base64 encoded JPEG image or None on failure
+        Raw JPEG bytes or None on failure
     """
     try:
-        # Find the latest segment file
-        stream_dir = settings.streams_dir / str(stream_id)
-        if not stream_dir.exists():
-            return None
+        latest_segment = Path(segment) if segment else None
 
-        # Get the most recent .ts file
-        ts_files = sorted(stream_dir.glob("*.ts"), key=lambda f: f.stat().st_mtime, reverse=True)
-        if not ts_files:
-            return None
+        if latest_segment is None or not latest_segment.exists():
+            # Find the latest segment file
+            stream_dir = settings.streams_dir / str(stream_id)
+            if not stream_dir.exists():
+                return None
+
+            # Get the most recent .ts file
+            ts_files = sorted(stream_dir.glob("*.ts"), key=lambda f: f.stat().st_mtime, reverse=True)
+            if not ts_files:
+                return None
 
-        latest_segment = ts_files[0]
+            latest_segment = ts_files[0]
 
         # FFmpeg command to capture a frame from the segment
         cmd = [
@@ -120,8 +126,7 @@ async def capture_thumbnail_from_hls(stream_id: str, width: int = 320, height: i
         )
 
         if process.returncode == 0 and stdout:
-            thumbnail = base64.b64encode(stdout).decode('utf-8')
-            return f"data:image/jpeg;base64,{thumbnail}"
+            return stdout
 
         return None
 
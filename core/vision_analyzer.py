@@ -2,21 +2,237 @@
 
 import asyncio
 import base64
+import io
+import json
 import logging
-import tempfile
-from pathlib import Path
-from typing import Optional
+from collections import OrderedDict
+from typing import Dict, Hashable, List, Optional, Tuple
 from dataclasses import dataclass
 
 import aiohttp
 
+try:
+    import orjson
+    ORJSON_AVAILABLE = True
+except ImportError:
+    ORJSON_AVAILABLE = False
+
+try:
+    import av
+    AV_AVAILABLE = True
+except ImportError:
+    AV_AVAILABLE = False
+
 from config import settings
+from core.webrtc_handler import webrtc_handler
 
 logger = logging.getLogger(__name__)
 
+# orjson.JSONDecodeError subclasses json.JSONDecodeError, so callers catch the latter
+_json_loads = orjson.loads if ORJSON_AVAILABLE else json.loads
+
 CLAUDE_API_URL = "https://api.anthropic.com/v1/messages"
 CLAUDE_MODEL = "claude-sonnet-4-20250514"
 
+# Longest image edge sent to the API; larger frames only cost upload time and tokens
+MAX_IMAGE_EDGE = 1024
+
+# Cached analyses are reused while a camera's frame hash differs by at most this many bits
+DHASH_MAX_DISTANCE = 5
+ANALYSIS_CACHE_SIZE = 256
+
+# Static instructions, sent as the system prompt ahead of the image
+PROMPT_TEXT = """Analyze this security camera image and suggest a short, descriptive name for this camera.
+
+Instructions:
+1. First, look for any text overlay on the image (camera names are often burned into the video by NVRs)
+2. If you find text that looks like a camera name, use that
+3. If no text is found, describe what the camera is viewing in 2-4 words
+
+Respond in this exact JSON format:
+{
+    "suggested_name": "Short Name Here",
+    "text_found": "any text overlay found or null",
+    "scene_description": "brief description of what the camera shows",
+    "confidence": "high/medium/low"
+}
+
+Examples of good names:
+- "Front Entrance"
+- "Parking Lot A"
+- "Server Room"
+- "Loading Dock 2"
+- "Main Hallway"
+- "CAM-01" (if that text was found in overlay)
+
+Keep the name short (2-4 words max). Only respond with JSON, no other text."""
+_SYSTEM = [{"type": "text", "text": PROMPT_TEXT}]
+
+# Same task for several cameras at once; each image is preceded by an "Image N:" label
+BATCH_PROMPT_TEXT = """Each of the following images is from a different security camera. Suggest a short, descriptive name for each camera.
+
+Instructions:
+1. First, look for any text overlay on the image (camera names are often burned into the video by NVRs)
+2. If you find text that looks like a camera name, use that
+3. If no text is found, describe what the camera is viewing in 2-4 words
+
+The images are labeled "Image 1:", "Image 2:" and so on. Respond in this exact JSON format, with one result per image:
+{
+    "results": [
+        {
+            "id": 1,
+            "suggested_name": "Short Name Here",
+            "text_found": "any text overlay found or null",
+            "scene_description": "brief description of what the camera shows",
+            "confidence": "high/medium/low"
+        }
+    ]
+}
+
+Examples of good names:
+- "Front Entrance"
+- "Parking Lot A"
+- "Server Room"
+- "Loading Dock 2"
+- "Main Hallway"
+- "CAM-01" (if that text was found in overlay)
+
+Keep each name short (2-4 words max). Only respond with JSON, no other text."""
+_BATCH_SYSTEM = [{"type": "text", "text": BATCH_PROMPT_TEXT}]
+
+# Most images sent in one batched request
+MAX_BATCH_IMAGES = 20
+
+# Request parts that never change, built once at import
+_BASE_HEADERS = {
+    "anthropic-version": "2023-06-01",
+    "content-type": "application/json"
+}
+
+
+def _dhash(image_data: bytes) -> Optional[int]:
+    """
+    Compute a 64-bit difference hash of a JPEG image.
+
+    The image is shrunk to 9x8 grayscale and each bit records whether a
+    pixel is brighter than its left neighbour, so small changes in the
+    scene only flip a few bits.
+    """
+    if not AV_AVAILABLE:
+        return None
+
+    try:
+        with av.open(io.BytesIO(image_data)) as container:
+            frame = next(container.decode(video=0))
+        plane = frame.reformat(width=9, height=8, format="gray").planes[0]
+        pixels = bytes(plane)
+    except Exception as e:
+        logger.debug(f"Failed to hash frame: {e}")
+        return None
+
+    value = 0
+    for y in range(8):
+        row = pixels[y * plane.line_size:y * plane.line_size + 9]
+        for x in range(8):
+            value = (value << 1) | (row[x + 1] > row[x])
+    return value
+
+
+def _image_block(image_data: bytes) -> dict:
+    """Build a base64 image content block for a JPEG frame."""
+    return {
+        "type": "image",
+        "source": {
+            "type": "base64",
+            "media_type": "image/jpeg",
+            # Encode image to base64 (the output is pure ASCII)
+            "data": base64.b64encode(memoryview(image_data)).decode('ascii')
+        }
+    }
+
+
+def _serialize_request(system: list, content: list, max_tokens: int) -> bytes:
+    """Serialize a Messages API request with a prebuilt system block."""
+    payload = {
+        "model": CLAUDE_MODEL,
+        "max_tokens": max_tokens,
+        "system": system,
+        "messages": [
+            {
+                "role": "user",
+                "content": content
+            }
+        ]
+    }
+    if ORJSON_AVAILABLE:
+        return orjson.dumps(payload)
+    return json.dumps(payload).encode()
+
+
+def _build_request_body(image_data: bytes) -> bytes:
+    """Build the serialized Messages API request for one JPEG frame."""
+    return _serialize_request(_SYSTEM, [_image_block(image_data)], 256)
+
+
+def _build_batch_request_body(images: List[bytes]) -> bytes:
+    """Build the serialized Messages API request for several JPEG frames."""
+    content = []
+    for image_id, image_data in enumerate(images, 1):
+        content.append({"type": "text", "text": f"Image {image_id}:"})
+        content.append(_image_block(image_data))
+    return _serialize_request(_BATCH_SYSTEM, content, 256 * len(images))
+
+
+def _extract_json(text: str) -> Optional[dict]:
+    """
+    Parse the first complete JSON object in a model reply.
+
+    Counts braces outside of string literals to find each balanced span;
+    a span that isn't valid JSON (e.g. "{note}" in chatter before the
+    object) is skipped and the scan resumes at the next brace.
+
+    Returns:
+        The parsed object, or None if the reply contains no valid object
+    """
+    start = text.find('{')
+    while start != -1:
+        end = _match_brace(text, start)
+        data = None
+        if end != -1:
+            try:
+                data = _json_loads(text[start:end + 1])
+            except ValueError:  # json and orjson decode errors are ValueErrors
+                pass
+        if isinstance(data, dict):
+            return data
+        start = text.find('{', start + 1)
+    return None
+
+
+def _match_brace(text: str, start: int) -> int:
+    """Index of the brace closing the one at text[start], or -1 if unbalanced."""
+    depth = 0
+    in_string = False
+    escaped = False
+    for i in range(start, len(text)):
+        char = text[i]
+        if in_string:
+            if escaped:
+                escaped = False
+            elif char == '\\':
+                escaped = True
+            elif char == '"':
+                in_string = False
+        elif char == '"':
+            in_string = True
+        elif char == '{':
+            depth += 1
+        elif char == '}':
+            depth -= 1
+            if depth == 0:
+                return i
+    return -1
+
 
 @dataclass
 class FrameAnalysis:
@@ -33,37 +249,94 @@ class VisionAnalyzer:
 
     def __init__(self):
         self._api_key: Optional[str] = None
+        self._session: Optional[aiohttp.ClientSession] = None
+        self._session_lock = asyncio.Lock()
+        # rtsp_url -> (frame dHash, analysis), least recently used first
+        self._analysis_cache: "OrderedDict[str, Tuple[int, FrameAnalysis]]" = OrderedDict()
 
     def set_api_key(self, api_key: str):
         """Set the Claude API key."""
         self._api_key = api_key
 
-    async def capture_frame(self, rtsp_url: str, timeout: int = 10) -> Optional[bytes]:
+    async def _get_session(self) -> aiohttp.ClientSession:
+        """Get the shared HTTP session, creating it on first use."""
+        if self._session is None or self._session.closed:
+            async with self._session_lock:
+                if self._session is None or self._session.closed:
+                    self._session = aiohttp.ClientSession(
+                        connector=aiohttp.TCPConnector(
+                            limit=32, limit_per_host=16, ttl_dns_cache=300,
+                            enable_cleanup_closed=True
+                        ),
+                        timeout=aiohttp.ClientTimeout(total=30),
+                        headers=_BASE_HEADERS
+                    )
+        return self._session
+
+    async def warmup(self):
+        """Resolve DNS and open a TLS connection to the API ahead of the first request."""
+        session = await self._get_session()
+        try:
+            async with session.options(CLAUDE_API_URL, timeout=aiohttp.ClientTimeout(total=5)):
+                pass
+        except Exception as e:
+            logger.debug(f"Claude API warmup failed: {e}")
+
+    async def close(self):
+        """Close the shared HTTP session."""
+        if self._session is not None:
+            await self._session.close()
+            self._session = None
+
+    async def capture_frame(
+        self,
+        rtsp_url: str,
+        timeout: int = 10,
+        fast_probe: bool = True
+    ) -> Optional[bytes]:
         """
         Capture a single frame from an RTSP stream using FFmpeg.
 
         Args:
             rtsp_url: RTSP URL of the camera
             timeout: Timeout in seconds
+            fast_probe: Skip input probing for a faster first frame; retried
+                with normal probing if FFmpeg fails
 
         Returns:
             JPEG image bytes or None on failure
         """
-        with tempfile.NamedTemporaryFile(suffix='.jpg', delete=False) as tmp:
-            tmp_path = tmp.name
+        # Reuse the decoder of a camera that is already playing over WebRTC
+        if fast_probe:
+            frame = await webrtc_handler.capture_jpeg(rtsp_url, max_edge=MAX_IMAGE_EDGE)
+            if frame:
+                return frame
 
         try:
-            # FFmpeg command to capture single frame
+            # FFmpeg command to capture single frame, written as JPEG to stdout
             cmd = [
                 'ffmpeg',
-                '-y',  # Overwrite output
                 '-rtsp_transport', 'tcp',
+                '-rtsp_flags', 'prefer_tcp',
+                '-fflags', 'nobuffer',  # Don't buffer input before decoding
+                '-flags', 'low_delay',
+                '-max_delay', '500000',
+            ]
+            if fast_probe:
+                cmd.extend(['-probesize', '32', '-analyzeduration', '0'])
+            cmd.extend([
                 '-i', rtsp_url,
                 '-frames:v', '1',  # Single frame
-                '-q:v', '2',  # High quality JPEG
-                '-f', 'image2',
-                tmp_path
-            ]
+                # Downscale to fit MAX_IMAGE_EDGE, keeping the aspect ratio
+                '-vf', (
+                    f"scale='min({MAX_IMAGE_EDGE},iw)':'min({MAX_IMAGE_EDGE},ih)'"
+                    ":force_original_aspect_ratio=decrease"
+                ),
+                '-q:v', '4',  # Good quality JPEG
+                '-f', 'image2pipe',
+                '-vcodec', 'mjpeg',
+                'pipe:1'
+            ])
 
             process = await asyncio.create_subprocess_exec(
                 *cmd,
@@ -72,7 +345,7 @@ class VisionAnalyzer:
             )
 
             try:
-                _, stderr = await asyncio.wait_for(
+                stdout, stderr = await asyncio.wait_for(
                     process.communicate(),
                     timeout=timeout
                 )
@@ -83,24 +356,18 @@ class VisionAnalyzer:
                 return None
 
             if process.returncode != 0:
+                if fast_probe:
+                    # Some cameras need a full probe to find the stream parameters
+                    logger.debug(f"Fast frame capture failed for {rtsp_url}, retrying with probing")
+                    return await self.capture_frame(rtsp_url, timeout, fast_probe=False)
                 logger.error(f"FFmpeg failed: {stderr.decode()[-500:]}")
                 return None
 
-            # Read the captured frame
-            tmp_file = Path(tmp_path)
-            if tmp_file.exists() and tmp_file.stat().st_size > 0:
-                return tmp_file.read_bytes()
-            return None
+            return stdout or None
 
         except Exception as e:
             logger.exception(f"Error capturing frame: {e}")
             return None
-        finally:
-            # Cleanup temp file
-            try:
-                Path(tmp_path).unlink(missing_ok=True)
-            except Exception:
-                pass
 
     async def analyze_frame(
         self,
@@ -124,127 +391,152 @@ class VisionAnalyzer:
                 error="Claude API key not configured"
             )
 
-        # Encode image to base64
-        image_b64 = base64.standard_b64encode(image_data).decode('utf-8')
+        # Encoding a large frame takes milliseconds; keep it off the event loop
+        body = await asyncio.to_thread(_build_request_body, image_data)
+        text, error = await self._send_request(key, body)
+        if error:
+            return FrameAnalysis(suggested_name="Camera", error=error)
 
-        prompt = """Analyze this security camera image and suggest a short, descriptive name for this camera.
+        # Parse JSON response
+        try:
+            data = _extract_json(text)
+        except json.JSONDecodeError:
+            # If JSON parsing fails, try to extract name from text
+            logger.warning(f"Failed to parse JSON from Claude response: {text}")
+            # Just use the first line as the name
+            name = text.strip().split('\n')[0][:50]
+            return FrameAnalysis(
+                suggested_name=name if name else "Camera",
+                scene_description=text[:200]
+            )
 
-Instructions:
-1. First, look for any text overlay on the image (camera names are often burned into the video by NVRs)
-2. If you find text that looks like a camera name, use that
-3. If no text is found, describe what the camera is viewing in 2-4 words
+        if data is None:
+            return FrameAnalysis(
+                suggested_name="Camera",
+                error="No content in API response"
+            )
+        return self._to_analysis(data)
 
-Respond in this exact JSON format:
-{
-    "suggested_name": "Short Name Here",
-    "text_found": "any text overlay found or null",
-    "scene_description": "brief description of what the camera shows",
-    "confidence": "high/medium/low"
-}
+    async def analyze_frames_batch(
+        self,
+        frames: List[Tuple[Hashable, bytes]],
+        api_key: str = None
+    ) -> Dict[Hashable, FrameAnalysis]:
+        """
+        Analyze several camera frames with one API request per batch.
 
-Examples of good names:
-- "Front Entrance"
-- "Parking Lot A"
-- "Server Room"
-- "Loading Dock 2"
-- "Main Hallway"
-- "CAM-01" (if that text was found in overlay)
+        Frames are sent in batches of up to MAX_BATCH_IMAGES images.
 
-Keep the name short (2-4 words max). Only respond with JSON, no other text."""
+        Args:
+            frames: (key, JPEG image bytes) pairs
+            api_key: Optional API key (uses stored key if not provided)
 
+        Returns:
+            FrameAnalysis per frame key
+        """
+        key = api_key or self._api_key
+        if not key:
+            return {
+                frame_key: FrameAnalysis(
+                    suggested_name="Camera",
+                    error="Claude API key not configured"
+                )
+                for frame_key, _ in frames
+            }
+
+        batches = [
+            frames[i:i + MAX_BATCH_IMAGES]
+            for i in range(0, len(frames), MAX_BATCH_IMAGES)
+        ]
+        results: Dict[Hashable, FrameAnalysis] = {}
+        for batch_results in await asyncio.gather(
+            *(self._analyze_batch(batch, key) for batch in batches)
+        ):
+            results.update(batch_results)
+        return results
+
+    async def _analyze_batch(
+        self,
+        frames: List[Tuple[Hashable, bytes]],
+        key: str
+    ) -> Dict[Hashable, FrameAnalysis]:
+        """Analyze up to MAX_BATCH_IMAGES frames in a single request."""
+        body = await asyncio.to_thread(
+            _build_batch_request_body, [image_data for _, image_data in frames]
+        )
+        text, error = await self._send_request(key, body)
+
+        by_id = {}
+        if not error:
+            try:
+                data = _extract_json(text) or {}
+                items = [item for item in data.get("results") or [] if isinstance(item, dict)]
+                for position, item in enumerate(items, 1):
+                    try:
+                        # The model may echo ids as strings ("1") or floats
+                        image_id = int(item.get("id"))
+                    except (TypeError, ValueError):
+                        # Missing or malformed id: assume results follow image order
+                        image_id = position
+                    by_id.setdefault(image_id, item)
+            except (json.JSONDecodeError, AttributeError):
+                logger.warning(f"Failed to parse JSON from Claude response: {text}")
+            if not by_id:
+                error = "No content in API response"
+
+        results = {}
+        for image_id, (frame_key, _) in enumerate(frames, 1):
+            item = by_id.get(image_id)
+            if item is not None:
+                results[frame_key] = self._to_analysis(item)
+            else:
+                results[frame_key] = FrameAnalysis(
+                    suggested_name="Camera",
+                    error=error or "No result for image in API response"
+                )
+        return results
+
+    def _to_analysis(self, data: dict) -> FrameAnalysis:
+        """Build a FrameAnalysis from one parsed JSON result."""
+        return FrameAnalysis(
+            suggested_name=data.get("suggested_name", "Camera"),
+            text_found=data.get("text_found"),
+            scene_description=data.get("scene_description"),
+            confidence=data.get("confidence", "medium")
+        )
+
+    async def _send_request(self, key: str, body: bytes) -> Tuple[Optional[str], Optional[str]]:
+        """
+        Send a serialized request to the Messages API.
+
+        Returns:
+            (reply text, None) on success or (None, error message)
+        """
         try:
-            async with aiohttp.ClientSession() as session:
-                headers = {
-                    "x-api-key": key,
-                    "anthropic-version": "2023-06-01",
-                    "content-type": "application/json"
-                }
-
-                payload = {
-                    "model": CLAUDE_MODEL,
-                    "max_tokens": 256,
-                    "messages": [
-                        {
-                            "role": "user",
-                            "content": [
-                                {
-                                    "type": "image",
-                                    "source": {
-                                        "type": "base64",
-                                        "media_type": "image/jpeg",
-                                        "data": image_b64
-                                    }
-                                },
-                                {
-                                    "type": "text",
-                                    "text": prompt
-                                }
-                            ]
-                        }
-                    ]
-                }
-
-                async with session.post(
-                    CLAUDE_API_URL,
-                    headers=headers,
-                    json=payload,
-                    timeout=aiohttp.ClientTimeout(total=30)
-                ) as response:
-                    if response.status != 200:
-                        error_text = await response.text()
-                        logger.error(f"Claude API error: {response.status} - {error_text}")
-                        return FrameAnalysis(
-                            suggested_name="Camera",
-                            error=f"API error: {response.status}"
-                        )
-
-                    result = await response.json()
-
-                    # Extract text content from response
-                    content = result.get("content", [])
-                    if content and content[0].get("type") == "text":
-                        text = content[0].get("text", "")
-
-                        # Parse JSON response
-                        import json
-                        try:
-                            # Find JSON in response
-                            json_start = text.find('{')
-                            json_end = text.rfind('}') + 1
-                            if json_start >= 0 and json_end > json_start:
-                                data = json.loads(text[json_start:json_end])
-                                return FrameAnalysis(
-                                    suggested_name=data.get("suggested_name", "Camera"),
-                                    text_found=data.get("text_found"),
-                                    scene_description=data.get("scene_description"),
-                                    confidence=data.get("confidence", "medium")
-                                )
-                        except json.JSONDecodeError:
-                            # If JSON parsing fails, try to extract name from text
-                            logger.warning(f"Failed to parse JSON from Claude response: {text}")
-                            # Just use the first line as the name
-                            name = text.strip().split('\n')[0][:50]
-                            return FrameAnalysis(
-                                suggested_name=name if name else "Camera",
-                                scene_description=text[:200]
-                            )
-
-                    return FrameAnalysis(
-                        suggested_name="Camera",
-                        error="No content in API response"
-                    )
+            session = await self._get_session()
+            async with session.post(
+                CLAUDE_API_URL,
+                headers={"x-api-key": key},
+                data=body
+            ) as response:
+                if response.status != 200:
+                    error_text = await response.text()
+                    logger.error(f"Claude API error: {response.status} - {error_text}")
+                    return None, f"API error: {response.status}"
+
+                result = await response.json(loads=_json_loads)
 
         except asyncio.TimeoutError:
-            return FrameAnalysis(
-                suggested_name="Camera",
-                error="API request timed out"
-            )
+            return None, "API request timed out"
         except Exception as e:
             logger.exception(f"Error calling Claude API: {e}")
-            return FrameAnalysis(
-                suggested_name="Camera",
-                error=str(e)
-            )
+            return None, str(e)
+
+        # Extract text content from response
+        content = result.get("content", [])
+        if content and content[0].get("type") == "text":
+            return content[0].get("text", ""), None
+        return None, "No content in API response"
 
     async def analyze_rtsp_stream(
         self,
@@ -269,8 +561,91 @@ Keep the name short (2-4 words max). Only respond with JSON, no other text."""
                 error="Failed to capture frame from camera"
             )
 
+        # Reuse the last analysis of this camera if the scene hasn't changed
+        frame_hash = await asyncio.to_thread(_dhash, frame_data)
+        cached = self._cached_analysis(rtsp_url, frame_hash)
+        if cached:
+            return cached
+
         # Analyze frame
-        return await self.analyze_frame(frame_data, api_key)
+        result = await self.analyze_frame(frame_data, api_key)
+        self._cache_analysis(rtsp_url, frame_hash, result)
+        return result
+
+    async def analyze_rtsp_streams_batch(
+        self,
+        cameras: List[Tuple[Hashable, str]],
+        api_key: str = None,
+        max_concurrent_captures: int = 3
+    ) -> Dict[Hashable, FrameAnalysis]:
+        """
+        Capture frames from several cameras and analyze them in batched requests.
+
+        Args:
+            cameras: (key, RTSP URL) pairs
+            api_key: Optional API key
+            max_concurrent_captures: Frames captured at the same time
+
+        Returns:
+            FrameAnalysis per camera key
+        """
+        semaphore = asyncio.Semaphore(max_concurrent_captures)
+
+        async def capture(rtsp_url: str) -> Tuple[Optional[bytes], Optional[int]]:
+            async with semaphore:
+                frame_data = await self.capture_frame(rtsp_url)
+            if not frame_data:
+                return None, None
+            return frame_data, await asyncio.to_thread(_dhash, frame_data)
+
+        captures = await asyncio.gather(*(capture(rtsp_url) for _, rtsp_url in cameras))
+
+        results: Dict[Hashable, FrameAnalysis] = {}
+        pending = []  # (camera key, frame)
+        hashes = {}  # camera key -> (rtsp_url, frame hash)
+        for (camera_key, rtsp_url), (frame_data, frame_hash) in zip(cameras, captures):
+            if not frame_data:
+                results[camera_key] = FrameAnalysis(
+                    suggested_name="Camera",
+                    error="Failed to capture frame from camera"
+                )
+                continue
+
+            cached = self._cached_analysis(rtsp_url, frame_hash)
+            if cached:
+                results[camera_key] = cached
+                continue
+
+            pending.append((camera_key, frame_data))
+            hashes[camera_key] = (rtsp_url, frame_hash)
+
+        if pending:
+            analyzed = await self.analyze_frames_batch(pending, api_key)
+            for camera_key, result in analyzed.items():
+                rtsp_url, frame_hash = hashes[camera_key]
+                self._cache_analysis(rtsp_url, frame_hash, result)
+                results[camera_key] = result
+
+        return results
+
+    def _cached_analysis(self, rtsp_url: str, frame_hash: Optional[int]) -> Optional[FrameAnalysis]:
+        """Get the cached analysis of a camera if its frame is close enough to the cached one."""
+        if frame_hash is None:
+            return None
+        cached = self._analysis_cache.get(rtsp_url)
+        if cached and bin(cached[0] ^ frame_hash).count("1") <= DHASH_MAX_DISTANCE:
+            self._analysis_cache.move_to_end(rtsp_url)
+            return cached[1]
+        return None
+
+    def _cache_analysis(self, rtsp_url: str, frame_hash: Optional[int], result: FrameAnalysis):
+        """Remember a successful analysis of a camera frame."""
+        if frame_hash is None or result.error:
+            return
+        self._analysis_cache[rtsp_url] = (frame_hash, result)
+        self._analysis_cache.move_to_end(rtsp_url)
+        if len(self._analysis_cache) > ANALYSIS_CACHE_SIZE:
+            self._analysis_cache.popitem(last=False)
 
 
 # Global instance
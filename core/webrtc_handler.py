@@ -2,15 +2,17 @@
 
 import asyncio
 import logging
-import subprocess
 import fractions
-from typing import Dict, Optional, Set
+import secrets
+from contextlib import asynccontextmanager
+from typing import AsyncIterator, Dict, Optional
 from dataclasses import dataclass, field
 
 try:
-    from aiortc import RTCPeerConnection, RTCSessionDescription, VideoStreamTrack
+    from aiortc import RTCPeerConnection, RTCRtpSender, RTCSessionDescription, VideoStreamTrack
     from aiortc.contrib.media import MediaPlayer, MediaRelay
-    from av import VideoFrame
+    from aiortc.mediastreams import MediaStreamError
+    import av
     WEBRTC_AVAILABLE = True
 except ImportError:
     WEBRTC_AVAILABLE = False
@@ -20,6 +22,41 @@ from config import settings
 logger = logging.getLogger(__name__)
 
 
+def _encode_jpeg(frame, max_edge: Optional[int] = None) -> bytes:
+    """Encode a decoded VideoFrame as a JPEG image, optionally downscaled."""
+    width, height = frame.width, frame.height
+    if max_edge and max(width, height) > max_edge:
+        scale = max_edge / max(width, height)
+        width = max(2, int(width * scale) // 2 * 2)
+        height = max(2, int(height * scale) // 2 * 2)
+
+    codec = av.CodecContext.create("mjpeg", "w")
+    codec.width = width
+    codec.height = height
+    codec.pix_fmt = "yuvj420p"
+    codec.time_base = fractions.Fraction(1, 1)
+    codec.bit_rate = 2_000_000  # Per-frame budget at a 1s time base, i.e. high quality
+
+    packets = codec.encode(frame.reformat(width=width, height=height, format="yuvj420p"))
+    packets.extend(codec.encode(None))
+    return b"".join(bytes(packet) for packet in packets)
+
+
+# H.264 profiles forwarded without re-encoding. aiortc offers constrained
+# baseline (profile-level-id 42e01f/42001f), and B-frames from Main/High break
+# playback in browsers that hold it to that.
+PASSTHROUGH_PROFILES = {"Baseline", "Constrained Baseline"}
+
+
+def _probe_h264_profile(rtsp_url: str, options: Dict[str, str]) -> Optional[str]:
+    """Read the profile of a camera's H.264 video stream (blocking)."""
+    with av.open(rtsp_url, format="rtsp", options=options, timeout=5) as container:
+        if not container.streams.video:
+            return None
+        codec_context = container.streams.video[0].codec_context
+        return codec_context.profile if codec_context.name == "h264" else None
+
+
 @dataclass
 class WebRTCStream:
     """Represents an active WebRTC stream."""
@@ -27,13 +64,15 @@ class WebRTCStream:
     rtsp_url: str
     relay: Optional[object] = None  # MediaRelay
     player: Optional[object] = None  # MediaPlayer
-    connections: Set[object] = field(default_factory=set)  # RTCPeerConnection set
+    passthrough: bool = False  # Player forwards encoded H.264 (video only) instead of decoding
+    connections: Dict[str, object] = field(default_factory=dict)  # client_id -> RTCPeerConnection
     task: Optional[asyncio.Task] = None
 
 
 class RTSPVideoTrack(VideoStreamTrack if WEBRTC_AVAILABLE else object):
     """
-    A video track that reads from RTSP using FFmpeg.
+    A video track that decodes RTSP with PyAV and hands the decoded
+    frames to aiortc as-is.
     """
     kind = "video"
 
@@ -41,31 +80,75 @@ class RTSPVideoTrack(VideoStreamTrack if WEBRTC_AVAILABLE else object):
         if WEBRTC_AVAILABLE:
             super().__init__()
         self.rtsp_url = rtsp_url
-        self._process: Optional[subprocess.Popen] = None
-        self._frame_count = 0
-        self._start_time = None
+        self._container = None  # av.container.InputContainer
+        self._frames = None  # Iterator of decoded video frames
+        self._reading = False
+
+    def _open(self):
+        """Open the RTSP input (blocking)."""
+        self._container = av.open(
+            self.rtsp_url,
+            options={
+                "rtsp_transport": "tcp",
+                "fflags": "nobuffer",
+                "flags": "low_delay",
+            },
+            timeout=5
+        )
+        video = self._container.streams.video[0]
+        video.thread_type = "AUTO"  # Multi-threaded decode
+        self._frames = self._container.decode(video)
+
+    def _read_frame(self):
+        """Decode the next frame, or None at end of stream (blocking)."""
+        if self._container is None:
+            self._open()
+        return next(self._frames, None)
+
+    def _close(self):
+        """Close the RTSP input without blocking the event loop."""
+        container, self._container, self._frames = self._container, None, None
+        if container is None:
+            return
+
+        # Closing sends an RTSP TEARDOWN, which can block on the network
+        try:
+            asyncio.get_running_loop().run_in_executor(None, container.close)
+        except RuntimeError:
+            container.close()  # No running loop (interpreter shutdown)
 
     async def recv(self):
         """Receive the next video frame."""
         if not WEBRTC_AVAILABLE:
             raise RuntimeError("WebRTC not available")
+        if self.readyState != "live":
+            raise MediaStreamError
 
-        # This is a simplified implementation
-        # In production, you'd read actual frames from FFmpeg
-        pts, time_base = await self.next_timestamp()
-
-        # Create a placeholder frame (in real impl, read from FFmpeg pipe)
-        frame = VideoFrame(width=640, height=480, format='rgb24')
-        frame.pts = pts
-        frame.time_base = time_base
-
+        # Demuxing and decoding block, so run them off the event loop
+        self._reading = True
+        try:
+            frame = await asyncio.to_thread(self._read_frame)
+        finally:
+            self._reading = False
+
+        if self.readyState != "live":
+            # Stopped while decoding
+            self._close()
+            raise MediaStreamError
+        if frame is None:
+            self.stop()
+            raise MediaStreamError
+
+        frame.pts, frame.time_base = await self.next_timestamp()
         return frame
 
     def stop(self):
         """Stop the video track."""
-        if self._process:
-            self._process.terminate()
-            self._process = None
+        if WEBRTC_AVAILABLE:
+            super().stop()
+        if not self._reading:
+            # Otherwise recv() closes the input once the decode returns
+            self._close()
 
 
 class WebRTCHandler:
@@ -73,7 +156,8 @@ class WebRTCHandler:
 
     def __init__(self):
         self._streams: Dict[int, WebRTCStream] = {}
-        self._lock = asyncio.Lock()
+        self._locks: Dict[int, asyncio.Lock] = {}  # Per-stream locks
+        self._h264_profiles: Dict[str, Optional[str]] = {}  # rtsp_url -> probed H.264 profile
 
         if not WEBRTC_AVAILABLE:
             logger.warning("WebRTC dependencies not installed. Install with: pip install aiortc av")
@@ -82,16 +166,45 @@ class WebRTCHandler:
     def available(self) -> bool:
         return WEBRTC_AVAILABLE
 
-    async def create_offer(self, stream_id: int, rtsp_url: str) -> Optional[dict]:
+    @asynccontextmanager
+    async def _stream_lock(self, stream_id: int) -> AsyncIterator[None]:
+        """Hold the lock serializing setup and teardown of one stream."""
+        while True:
+            # setdefault doesn't yield, so no lock is needed around it
+            lock = self._locks.setdefault(stream_id, asyncio.Lock())
+            await lock.acquire()
+            if self._locks.get(stream_id) is lock:
+                break
+            # The stream was torn down and its lock dropped while we waited
+            lock.release()
+        try:
+            yield
+        finally:
+            lock.release()
+
+    async def create_offer(
+        self,
+        stream_id: int,
+        rtsp_url: str,
+        video_codec: Optional[str] = None,
+        client_id: Optional[str] = None
+    ) -> Optional[dict]:
         """
         Create a WebRTC offer for a stream.
 
-        Returns SDP offer to send to the client.
+        Args:
+            stream_id: Stream ID
+            rtsp_url: RTSP URL of the camera
+            video_codec: Detected source video codec; baseline H.264 is
+                forwarded without re-encoding, video only
+            client_id: Viewer session ID (generated if not provided)
+
+        Returns SDP offer and client_id to send to the client.
         """
         if not WEBRTC_AVAILABLE:
             return None
 
-        async with self._lock:
+        async with self._stream_lock(stream_id):
             # Get or create stream
             if stream_id not in self._streams:
                 self._streams[stream_id] = WebRTCStream(
@@ -102,43 +215,66 @@ class WebRTCHandler:
             stream = self._streams[stream_id]
 
             # Create peer connection
+            if not client_id:
+                client_id = secrets.token_hex(8)
             pc = RTCPeerConnection()
-            stream.connections.add(pc)
+            stream.connections[client_id] = pc
 
             @pc.on("connectionstatechange")
             async def on_connectionstatechange():
                 logger.info(f"WebRTC connection state: {pc.connectionState}")
                 if pc.connectionState == "failed" or pc.connectionState == "closed":
-                    await self._cleanup_connection(stream_id, pc)
+                    await self._cleanup_connection(stream_id, client_id, pc)
 
-            # Create media player for RTSP
+            # Create the media player for RTSP once; all viewers share it via the relay
             try:
-                # Use MediaPlayer to read from RTSP
-                options = {
-                    "rtsp_transport": "tcp",
-                    "rtsp_flags": "prefer_tcp",
-                    "fflags": "nobuffer",
-                    "flags": "low_delay",
-                }
-                player = MediaPlayer(
-                    rtsp_url,
-                    format="rtsp",
-                    options=options
-                )
-                stream.player = player
+                if stream.player is None:
+                    options = {
+                        "rtsp_transport": "tcp",
+                        "rtsp_flags": "prefer_tcp",
+                        "fflags": "nobuffer",
+                        "flags": "low_delay",
+                    }
+                    # Baseline H.264 sources are sent as-is instead of decoded and re-encoded
+                    stream.passthrough = (
+                        video_codec == "h264"
+                        and await self._h264_profile(rtsp_url, options) in PASSTHROUGH_PROFILES
+                    )
+                    if stream.passthrough:
+                        # Passthrough is video only. With decode=False MediaPlayer makes no
+                        # audio track for AAC anyway; this just skips setting up the RTSP
+                        # audio stream so the camera doesn't send packets nobody reads
+                        options["allowed_media_types"] = "video"
+                    stream.player = MediaPlayer(
+                        rtsp_url,
+                        format="rtsp",
+                        options=options,
+                        decode=not stream.passthrough
+                    )
+                    stream.relay = MediaRelay()
+
+                player = stream.player
 
                 # Add video track
                 if player.video:
-                    pc.addTrack(player.video)
+                    track = stream.relay.subscribe(player.video)
+                    if stream.passthrough:
+                        transceiver = pc.addTransceiver(track, direction="sendonly")
+                        transceiver.setCodecPreferences([
+                            codec for codec in RTCRtpSender.getCapabilities("video").codecs
+                            if codec.mimeType == "video/H264"
+                        ])
+                    else:
+                        pc.addTrack(track)
 
                 # Add audio track if available
                 if player.audio:
-                    pc.addTrack(player.audio)
+                    pc.addTrack(stream.relay.subscribe(player.audio))
 
             except Exception as e:
                 logger.error(f"Failed to create media player: {e}")
                 await pc.close()
-                stream.connections.discard(pc)
+                stream.connections.pop(client_id, None)
                 return None
 
             # Create offer
@@ -146,11 +282,39 @@ class WebRTCHandler:
             await pc.setLocalDescription(offer)
 
             return {
+                "client_id": client_id,
                 "sdp": pc.localDescription.sdp,
                 "type": pc.localDescription.type
             }
 
-    async def handle_answer(self, stream_id: int, sdp: str, sdp_type: str) -> bool:
+    async def _h264_profile(self, rtsp_url: str, options: Dict[str, str]) -> Optional[str]:
+        """Get a camera's H.264 profile, probing it once per URL."""
+        if rtsp_url not in self._h264_profiles:
+            try:
+                self._h264_profiles[rtsp_url] = await asyncio.to_thread(
+                    _probe_h264_profile, rtsp_url, {**options, "allowed_media_types": "video"}
+                )
+            except Exception as e:
+                logger.debug(f"Failed to probe H.264 profile, decoding instead: {e}")
+                return None  # Not cached, so the next viewer probes again
+        return self._h264_profiles[rtsp_url]
+
+    def _get_connection(self, stream_id: int, client_id: Optional[str]):
+        """Get a viewer's peer connection, or the most recent one without a client_id."""
+        stream = self._streams.get(stream_id)
+        if not stream:
+            return None
+        if client_id:
+            return stream.connections.get(client_id)
+        return next(reversed(stream.connections.values()), None)
+
+    async def handle_answer(
+        self,
+        stream_id: int,
+        sdp: str,
+        sdp_type: str,
+        client_id: Optional[str] = None
+    ) -> bool:
         """
         Handle WebRTC answer from client.
 
@@ -158,6 +322,7 @@ class WebRTCHandler:
             stream_id: Stream ID
             sdp: SDP answer from client
             sdp_type: SDP type (should be "answer")
+            client_id: Viewer session ID returned with the offer
 
         Returns:
             True if successful
@@ -165,12 +330,7 @@ class WebRTCHandler:
         if not WEBRTC_AVAILABLE:
             return False
 
-        stream = self._streams.get(stream_id)
-        if not stream or not stream.connections:
-            return False
-
-        # Get the most recent connection (last one created)
-        pc = next(iter(stream.connections), None)
+        pc = self._get_connection(stream_id, client_id)
         if not pc:
             return False
 
@@ -182,16 +342,17 @@ class WebRTCHandler:
             logger.error(f"Failed to set remote description: {e}")
             return False
 
-    async def handle_ice_candidate(self, stream_id: int, candidate: dict) -> bool:
+    async def handle_ice_candidate(
+        self,
+        stream_id: int,
+        candidate: dict,
+        client_id: Optional[str] = None
+    ) -> bool:
         """Handle ICE candidate from client."""
         if not WEBRTC_AVAILABLE:
             return False
 
-        stream = self._streams.get(stream_id)
-        if not stream or not stream.connections:
-            return False
-
-        pc = next(iter(stream.connections), None)
+        pc = self._get_connection(stream_id, client_id)
         if not pc:
             return False
 
@@ -202,37 +363,94 @@ class WebRTCHandler:
             logger.error(f"Failed to add ICE candidate: {e}")
             return False
 
-    async def _cleanup_connection(self, stream_id: int, pc):
+    async def close_connection(self, stream_id: int, client_id: str):
+        """Close one viewer's connection, keeping the stream for other viewers."""
+        pc = self._get_connection(stream_id, client_id)
+        if pc:
+            await pc.close()
+            await self._cleanup_connection(stream_id, client_id, pc)
+
+    async def _cleanup_connection(self, stream_id: int, client_id: str, pc):
         """Clean up a closed connection."""
-        async with self._lock:
+        async with self._stream_lock(stream_id):
             stream = self._streams.get(stream_id)
             if stream:
-                stream.connections.discard(pc)
+                if stream.connections.get(client_id) is pc:
+                    del stream.connections[client_id]
 
                 # If no more connections, cleanup the stream
                 if not stream.connections:
-                    if stream.player:
-                        stream.player.video.stop() if stream.player.video else None
-                        stream.player.audio.stop() if stream.player.audio else None
+                    self._stop_player(stream)
                     del self._streams[stream_id]
 
     async def stop_stream(self, stream_id: int):
         """Stop all WebRTC connections for a stream."""
-        async with self._lock:
+        async with self._stream_lock(stream_id):
             stream = self._streams.get(stream_id)
             if stream:
-                for pc in list(stream.connections):
+                for pc in list(stream.connections.values()):
                     await pc.close()
                 stream.connections.clear()
 
-                if stream.player:
-                    if stream.player.video:
-                        stream.player.video.stop()
-                    if stream.player.audio:
-                        stream.player.audio.stop()
-
+                self._stop_player(stream)
                 del self._streams[stream_id]
 
+    def _stop_player(self, stream: WebRTCStream):
+        """Stop a stream's media player tracks and drop the player."""
+        if not stream.connections:
+            # Last viewer gone: forget the stream's lock too
+            self._locks.pop(stream.stream_id, None)
+
+        if (player := stream.player) is None:
+            return
+        stream.player = None
+
+        # Stop each track independently so one failure doesn't leak the other
+        for track in (player.audio, player.video):
+            if track is not None:
+                try:
+                    track.stop()
+                except Exception:
+                    logger.exception(f"Failed to stop {track.kind} track for stream {stream.stream_id}")
+
+    async def capture_jpeg(
+        self,
+        rtsp_url: str,
+        timeout: float = 5,
+        max_edge: Optional[int] = None
+    ) -> Optional[bytes]:
+        """
+        Grab one frame from an active WebRTC stream of a camera.
+
+        Args:
+            rtsp_url: RTSP URL of the camera
+            timeout: Seconds to wait for the next frame
+            max_edge: Downscale so the longest edge is at most this many pixels
+
+        Returns:
+            JPEG image bytes, or None if no stream for the URL is playing
+        """
+        if not WEBRTC_AVAILABLE:
+            return None
+
+        stream = next(
+            (s for s in self._streams.values() if s.rtsp_url == rtsp_url), None
+        )
+        if not stream or not stream.relay or not stream.player or not stream.player.video:
+            return None
+        if stream.passthrough:
+            return None  # Player yields encoded packets, not frames
+
+        track = stream.relay.subscribe(stream.player.video, buffered=False)
+        try:
+            frame = await asyncio.wait_for(track.recv(), timeout=timeout)
+            return await asyncio.to_thread(_encode_jpeg, frame, max_edge)
+        except Exception as e:
+            logger.debug(f"Failed to capture frame from WebRTC stream {stream.stream_id}: {e}")
+            return None
+        finally:
+            track.stop()
+
     def get_stats(self, stream_id: int) -> dict:
         """Get WebRTC stream statistics."""
         stream = self._streams.get(stream_id)
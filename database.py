@@ -1,23 +1,68 @@
 """Database models and operations using SQLite."""
 
 import aiosqlite
+import asyncio
+import base64
+import binascii
 import json
+import os
 import secrets
 import hashlib
-from datetime import datetime, timedelta
+import logging
+import time
+from collections import OrderedDict
+from contextlib import asynccontextmanager
+from datetime import datetime, timedelta, timezone
 from pathlib import Path
-from typing import Optional, List, Dict, Any
-from dataclasses import dataclass, asdict
+from typing import Any, AsyncContextManager, Callable, Dict, List, Optional
+from dataclasses import dataclass, fields
 from enum import Enum
+from itertools import groupby
 
 from config import settings
 
+logger = logging.getLogger(__name__)
+
+# Hot-path statements, shared so every call hits the same sqlite3 statement cache entry
+_SQL_GET_STREAM = "SELECT * FROM streams WHERE id = ?"
+_SQL_STREAM_EXISTS = "SELECT 1 FROM streams WHERE id = ?"
+_SQL_GET_SESSION = "SELECT * FROM sessions WHERE token = ?"
+_SQL_GET_USER = "SELECT * FROM users WHERE id = ?"
+_SQL_TOUCH_API_KEY = "UPDATE api_keys SET last_used = ? WHERE id = ?"
+_SQL_SET_STATUS = "UPDATE streams SET status = ?, updated_at = ? WHERE id = ?"
+_SQL_UPDATE_STATUS = "UPDATE streams SET status = ?, last_error = ?, pid = ?, updated_at = ? WHERE id = ?"
+_SQL_INSERT_STREAM = """
+    INSERT INTO streams (
+        id, name, rtsp_url, mode, status, video_codec, audio_codec,
+        resolution, framerate, bitrate, ffmpeg_overrides,
+        keep_alive_seconds, use_transcode, latency_mode, group_name,
+        created_at, updated_at
+    ) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+"""
+_SQL_UPDATE_VIEWERS = "UPDATE streams SET viewer_count = ?, last_viewer_time = ?, updated_at = ? WHERE id = ?"
+
 
 def generate_uid() -> str:
     """Generate a unique ID for streams."""
     return secrets.token_urlsafe(12)  # 16 chars, URL-safe
 
 
+_now_cache: tuple[float, str] = (0.0, "")
+
+
+def _now_iso() -> str:
+    """
+    Current UTC time as a naive ISO string (same format as utcnow().isoformat()).
+
+    Bursts of writes in the same millisecond share one formatted timestamp.
+    """
+    global _now_cache
+    t = time.time()
+    if t - _now_cache[0] > 0.001:
+        _now_cache = (t, datetime.fromtimestamp(t, tz=timezone.utc).replace(tzinfo=None).isoformat())
+    return _now_cache[1]
+
+
 def hash_password(password: str, salt: str = None) -> tuple[str, str]:
     """Hash a password with salt."""
     if salt is None:
@@ -51,7 +96,7 @@ class StreamStatus(str, Enum):
     RECONNECTING = "reconnecting"
 
 
-@dataclass
+@dataclass(slots=True)
 class User:
     """User model."""
     id: Optional[int] = None
@@ -61,12 +106,8 @@ class User:
     is_admin: bool = False
     created_at: Optional[str] = None
 
-    @classmethod
-    def from_row(cls, row: aiosqlite.Row) -> "User":
-        return cls(**dict(row))
-
 
-@dataclass
+@dataclass(slots=True)
 class Session:
     """Session model."""
     id: Optional[int] = None
@@ -74,13 +115,10 @@ class Session:
     token: str = ""
     expires_at: str = ""
     created_at: Optional[str] = None
+    expires_at_ts: int = 0  # expires_at as unix epoch seconds
 
-    @classmethod
-    def from_row(cls, row: aiosqlite.Row) -> "Session":
-        return cls(**dict(row))
 
-
-@dataclass
+@dataclass(slots=True)
 class ApiKey:
     """API Key model."""
     id: Optional[int] = None
@@ -90,12 +128,8 @@ class ApiKey:
     created_at: Optional[str] = None
     last_used: Optional[str] = None
 
-    @classmethod
-    def from_row(cls, row: aiosqlite.Row) -> "ApiKey":
-        return cls(**dict(row))
-
 
-@dataclass
+@dataclass(slots=True)
 class Stream:
     """Stream model."""
     id: Optional[str] = None  # Changed to string UID
@@ -127,46 +161,291 @@ class Stream:
 
     # Organization
     group_name: Optional[str] = None  # For grouping cameras (e.g., NVR IP)
-    thumbnail: Optional[str] = None  # Base64 encoded thumbnail image
+    thumbnail: Optional[bytes] = None  # Raw JPEG thumbnail image
     thumbnail_updated: Optional[str] = None  # When thumbnail was last updated
 
     # Timestamps
     created_at: Optional[str] = None
     updated_at: Optional[str] = None
 
-    def to_dict(self) -> Dict[str, Any]:
-        """Convert to dictionary."""
-        return asdict(self)
+    @property
+    def thumbnail_data_url(self) -> Optional[str]:
+        """Thumbnail as a base64 data URL for inlining in HTML (encoded on access)."""
+        if not self.thumbnail:
+            return None
+        return f"data:image/jpeg;base64,{base64.b64encode(self.thumbnail).decode('ascii')}"
+
+
+def _compile_model(cls):
+    """
+    Generate the from_row and to_dict methods for a model dataclass.
+
+    Both are built once from the field names: from_row assigns each column
+    straight onto a bare instance, skipping the dict(row) copy and keyword
+    validation of cls(**dict(row)), and to_dict builds the dict literally
+    instead of going through asdict's recursive copy. Columns are read by
+    name because migrated tables may order them differently from the
+    dataclass. Every field is a scalar or bytes, so no deep copy is needed.
+    """
+    names = tuple(f.name for f in fields(cls))
+    lines = ["def from_row(cls, row):", "    obj = object.__new__(cls)"]
+    lines += [f"    obj.{name} = row[{name!r}]" for name in names]
+    lines.append("    return obj")
+    lines.append("def to_dict(self):")
+    lines.append("    return {" + ", ".join(f"{name!r}: self.{name}" for name in names) + "}")
+    namespace: Dict[str, Any] = {}
+    exec("\n".join(lines), namespace)
+
+    from_row = namespace["from_row"]
+    from_row.__doc__ = "Create from database row."
+    to_dict = namespace["to_dict"]
+    to_dict.__doc__ = "Convert to dictionary."
+    cls._FIELDS = names
+    cls.from_row = classmethod(from_row)
+    cls.to_dict = to_dict
+
+
+for _model in (User, Session, ApiKey, Stream):
+    _compile_model(_model)
+
+
+class _WriteQueue:
+    """
+    Coalesces small UPDATEs into one transaction per event loop tick.
+
+    Callers enqueue (sql, params) and await the returned future; the drain
+    task takes everything queued so far, runs consecutive statements with the
+    same SQL as a single executemany and commits once for the whole batch.
+    Batches run inside the owner's writer transaction (see
+    Database._transaction), so they never share a transaction with other writes.
+    """
+
+    def __init__(self, transaction: Callable[[], AsyncContextManager[aiosqlite.Connection]]):
+        self._transaction = transaction
+        self._queue: asyncio.Queue = asyncio.Queue()
+        self._task: Optional[asyncio.Task] = None
+
+    def start(self):
+        """Start the drain task."""
+        if self._task is None:
+            self._task = asyncio.create_task(self._drain())
+
+    async def stop(self):
+        """Flush pending writes and stop the drain task."""
+        if self._task is None:
+            return
+        self._queue.put_nowait(None)
+        await self._task
+        self._task = None
+
+    def enqueue(self, sql: str, params_seq: List[tuple]) -> asyncio.Future:
+        """Queue one statement with one or more parameter tuples."""
+        future = asyncio.get_running_loop().create_future()
+        self._queue.put_nowait((sql, params_seq, future))
+        return future
+
+    async def _drain(self):
+        """Write queued statements in batches until stopped."""
+        stopping = False
+        while not stopping:
+            items = [await self._queue.get()]
+            items.extend(self._queue.get_nowait() for _ in range(self._queue.qsize()))
+            if None in items:
+                stopping = True
+                items = [item for item in items if item is not None]
+            if items:
+                await self._write_batch(items)
+
+    async def _write_batch(self, items: List[tuple]):
+        """Run a batch of queued statements in one transaction."""
+        futures = [future for _, _, future in items]
+        try:
+            async with self._transaction() as connection:
+                for sql, group in groupby(items, key=lambda item: item[0]):
+                    await connection.executemany(
+                        sql, [params for _, params_seq, _ in group for params in params_seq]
+                    )
+        except Exception as e:
+            logger.error(f"Batched database write failed: {e}")
+            for future in futures:
+                if not future.done():
+                    future.set_exception(e)
+            return
 
-    @classmethod
-    def from_row(cls, row: aiosqlite.Row) -> "Stream":
-        """Create from database row."""
-        return cls(**dict(row))
+        for future in futures:
+            if not future.done():
+                future.set_result(None)
 
 
 class Database:
-    """Async SQLite database handler."""
+    """
+    Async SQLite database handler.
+
+    Writes go through a single writer connection; SELECTs are served by a
+    small pool of reader connections, which WAL mode lets run alongside
+    the writer.
+    """
+
+    READER_POOL_SIZE = min(os.cpu_count() or 1, 8)
+    STREAM_EXISTS_TTL = 30  # seconds
+    STREAM_EXISTS_CACHE_SIZE = 1024
+    API_KEY_CACHE_SIZE = 1024
+    API_KEY_LAST_USED_INTERVAL = 30  # seconds between last_used writes per key
+    SESSION_CACHE_TTL = 60  # seconds
+    SESSION_CACHE_SIZE = 1024
+    STATEMENT_CACHE_SIZE = 256  # Prepared statements kept per connection (sqlite3 default: 128)
+    OPTIMIZE_INTERVAL = 3600  # Seconds between planner statistics / WAL checkpoint runs
+    WRITER_CACHE_KIB = 65536  # Page cache of the writer connection (64 MiB)
+    READER_CACHE_KIB = 65536  # Page cache shared out across the reader pool (64 MiB total)
 
     def __init__(self, db_path: Path = None):
         self.db_path = db_path or settings.database_path
-        self._connection: Optional[aiosqlite.Connection] = None
+        self._writer: Optional[aiosqlite.Connection] = None
+        self._write_lock = asyncio.Lock()  # One writer transaction at a time
+        self._readers: List[aiosqlite.Connection] = []
+        self._reader_queue: Optional[asyncio.Queue] = None
+        self._write_queue: Optional[_WriteQueue] = None
+        self._optimize_task: Optional[asyncio.Task] = None
+        self._stream_exists_cache: "OrderedDict[str, float]" = OrderedDict()  # existing stream_id -> expiry (LRU)
+        self._api_key_cache: "OrderedDict[str, ApiKey]" = OrderedDict()  # key_hash -> ApiKey (LRU)
+        self._api_key_last_used: Dict[int, float] = {}  # key id -> time.monotonic() of last write
+        self._search_fts = False  # streams_fts trigram index available
+        self._session_cache: "OrderedDict[str, tuple[Session, float]]" = OrderedDict()  # token -> (session, cache expiry in time.monotonic()) (LRU)
 
     async def connect(self):
         """Connect to database."""
-        self._connection = await aiosqlite.connect(self.db_path)
-        self._connection.row_factory = aiosqlite.Row
+        self._writer = await self._open_connection()
         await self._create_tables()
 
+        # Fresh planner statistics for the indexes created above
+        await self._writer.execute("ANALYZE")
+        await self._writer.commit()
+
+        # Readers are opened after the schema exists so they never see a
+        # half-migrated database
+        self._readers = [
+            await self._open_connection(read_only=True)
+            for _ in range(self.READER_POOL_SIZE)
+        ]
+        self._reader_queue = asyncio.Queue()
+        for reader in self._readers:
+            self._reader_queue.put_nowait(reader)
+
+        self._write_queue = _WriteQueue(self._transaction)
+        self._write_queue.start()
+        self._optimize_task = asyncio.create_task(self._optimize_loop())
+
+    async def _open_connection(self, read_only: bool = False) -> aiosqlite.Connection:
+        """Open a configured connection to the database file."""
+        connection = await aiosqlite.connect(self.db_path, cached_statements=self.STATEMENT_CACHE_SIZE)
+        connection.row_factory = aiosqlite.Row
+        if read_only:
+            # Readers also share the OS page cache through mmap, so a slice is enough
+            await self._configure_connection(connection, self.READER_CACHE_KIB // self.READER_POOL_SIZE)
+            await connection.execute("PRAGMA query_only=ON")
+        else:
+            await self._configure_connection(connection, self.WRITER_CACHE_KIB)
+        return connection
+
+    async def _configure_connection(self, connection: aiosqlite.Connection, cache_kib: int):
+        """Apply connection PRAGMAs (WAL so frequent small commits stay cheap)."""
+        for pragma in (
+            "PRAGMA journal_mode=WAL",
+            "PRAGMA synchronous=NORMAL",  # WAL is still crash-safe; only the last commits may roll back on power loss
+            "PRAGMA temp_store=MEMORY",
+            f"PRAGMA cache_size=-{cache_kib}",  # Negative: size in KiB rather than pages
+            "PRAGMA mmap_size=268435456",  # 256 MiB
+            "PRAGMA busy_timeout=5000",
+            "PRAGMA wal_autocheckpoint=1000",
+        ):
+            await connection.execute(pragma)
+
     async def close(self):
-        """Close database connection."""
-        if self._connection:
-            await self._connection.close()
-            self._connection = None
+        """Close database connections."""
+        if self._optimize_task:
+            self._optimize_task.cancel()
+            try:
+                await self._optimize_task
+            except asyncio.CancelledError:
+                pass
+            self._optimize_task = None
+
+        if self._write_queue:
+            await self._write_queue.stop()
+            self._write_queue = None
+
+        for reader in self._readers:
+            await reader.close()
+        self._readers = []
+        self._reader_queue = None
+
+        if self._writer:
+            async with self._write_lock:
+                await self._writer.execute("PRAGMA optimize")
+                await self._writer.close()
+                self._writer = None
+
+    async def optimize(self):
+        """Refresh planner statistics where needed and truncate the WAL."""
+        async with self._write_lock:
+            await self._writer.execute("PRAGMA optimize")
+            await self._writer.execute("PRAGMA wal_checkpoint(TRUNCATE)")
+
+    @asynccontextmanager
+    async def _transaction(self):
+        """
+        Run a write transaction on the writer connection.
+
+        sqlite3 opens transactions implicitly, so writers sharing the
+        connection would otherwise commit or roll back each other's
+        statements. The lock keeps each execute...commit/rollback whole.
+        """
+        async with self._write_lock:
+            try:
+                yield self._writer
+            except BaseException:
+                await self._writer.rollback()
+                raise
+            await self._writer.commit()
+
+    async def _optimize_loop(self):
+        """Run optimize() every OPTIMIZE_INTERVAL seconds."""
+        while True:
+            await asyncio.sleep(self.OPTIMIZE_INTERVAL)
+            try:
+                await self.optimize()
+            except Exception as e:
+                logger.error(f"Database optimize failed: {e}")
+
+    @asynccontextmanager
+    async def reader(self):
+        """Borrow a reader connection from the pool (the writer if no pool is open)."""
+        if self._reader_queue is None:
+            yield self._writer
+            return
+
+        connection = await self._reader_queue.get()
+        try:
+            yield connection
+        finally:
+            self._reader_queue.put_nowait(connection)
+
+    async def _fetchone(self, sql: str, params=()) -> Optional[aiosqlite.Row]:
+        """Run a SELECT on a reader connection and return the first row."""
+        async with self.reader() as connection:
+            cursor = await connection.execute(sql, params)
+            return await cursor.fetchone()
+
+    async def _fetchall(self, sql: str, params=()) -> List[aiosqlite.Row]:
+        """Run a SELECT on a reader connection and return all rows."""
+        async with self.reader() as connection:
+            cursor = await connection.execute(sql, params)
+            return await cursor.fetchall()
 
     async def _create_tables(self):
         """Create database tables if they don't exist."""
         # Users table
-        await self._connection.execute("""
+        await self._writer.execute("""
             CREATE TABLE IF NOT EXISTS users (
                 id INTEGER PRIMARY KEY AUTOINCREMENT,
                 username TEXT NOT NULL UNIQUE,
@@ -178,7 +457,7 @@ class Database:
         """)
 
         # Sessions table
-        await self._connection.execute("""
+        await self._writer.execute("""
             CREATE TABLE IF NOT EXISTS sessions (
                 id INTEGER PRIMARY KEY AUTOINCREMENT,
                 user_id INTEGER NOT NULL,
@@ -189,8 +468,22 @@ class Database:
             )
         """)
 
+        # Migration: expiry as unix epoch seconds, for indexed sweeps and cheap checks
+        try:
+            await self._writer.execute(
+                "ALTER TABLE sessions ADD COLUMN expires_at_ts INTEGER"
+            )
+            await self._writer.execute(
+                "UPDATE sessions SET expires_at_ts = CAST(strftime('%s', expires_at) AS INTEGER)"
+            )
+        except Exception:
+            pass  # Column already exists
+        await self._writer.execute(
+            "CREATE INDEX IF NOT EXISTS idx_sessions_expires ON sessions(expires_at_ts)"
+        )
+
         # API Keys table
-        await self._connection.execute("""
+        await self._writer.execute("""
             CREATE TABLE IF NOT EXISTS api_keys (
                 id INTEGER PRIMARY KEY AUTOINCREMENT,
                 name TEXT NOT NULL,
@@ -200,9 +493,12 @@ class Database:
                 last_used TEXT
             )
         """)
+        await self._writer.execute(
+            "CREATE INDEX IF NOT EXISTS idx_api_keys_prefix ON api_keys(key_prefix)"
+        )
 
         # Streams table - with string ID
-        await self._connection.execute("""
+        await self._writer.execute("""
             CREATE TABLE IF NOT EXISTS streams (
                 id TEXT PRIMARY KEY,
                 name TEXT NOT NULL,
@@ -228,7 +524,7 @@ class Database:
         """)
         # Migration: add latency_mode column if it doesn't exist
         try:
-            await self._connection.execute(
+            await self._writer.execute(
                 "ALTER TABLE streams ADD COLUMN latency_mode TEXT DEFAULT 'stable'"
             )
         except Exception:
@@ -236,7 +532,7 @@ class Database:
 
         # Migration: add group_name column
         try:
-            await self._connection.execute(
+            await self._writer.execute(
                 "ALTER TABLE streams ADD COLUMN group_name TEXT"
             )
         except Exception:
@@ -244,34 +540,53 @@ class Database:
 
         # Migration: add thumbnail columns
         try:
-            await self._connection.execute(
+            await self._writer.execute(
                 "ALTER TABLE streams ADD COLUMN thumbnail TEXT"
             )
         except Exception:
             pass
         try:
-            await self._connection.execute(
+            await self._writer.execute(
                 "ALTER TABLE streams ADD COLUMN thumbnail_updated TEXT"
             )
         except Exception:
             pass
 
+        # Migration: thumbnails used to be stored as base64 data URLs, now raw JPEG bytes
+        cursor = await self._writer.execute(
+            "SELECT id, thumbnail FROM streams WHERE typeof(thumbnail) = 'text'"
+        )
+        for stream_id, data_url in await cursor.fetchall():
+            try:
+                thumbnail = base64.b64decode(data_url.split(",", 1)[-1], validate=True)
+            except (ValueError, binascii.Error):
+                thumbnail = None
+            await self._writer.execute(
+                "UPDATE streams SET thumbnail = ? WHERE id = ?", (thumbnail, stream_id)
+            )
+
         # Create indexes for better performance with 300+ cameras
-        await self._connection.execute(
+        await self._writer.execute(
             "CREATE INDEX IF NOT EXISTS idx_streams_status ON streams(status)"
         )
-        await self._connection.execute(
+        await self._writer.execute(
             "CREATE INDEX IF NOT EXISTS idx_streams_mode ON streams(mode)"
         )
-        await self._connection.execute(
+        await self._writer.execute(
             "CREATE INDEX IF NOT EXISTS idx_streams_name ON streams(name)"
         )
-        await self._connection.execute(
+        await self._writer.execute(
             "CREATE INDEX IF NOT EXISTS idx_streams_group ON streams(group_name)"
         )
+        # Covers get_stream_counts, which only reads status and mode
+        await self._writer.execute(
+            "CREATE INDEX IF NOT EXISTS idx_streams_status_mode ON streams(status, mode)"
+        )
+
+        self._search_fts = await self._create_search_index()
 
         # Settings table for app configuration (API keys, etc.)
-        await self._connection.execute("""
+        await self._writer.execute("""
             CREATE TABLE IF NOT EXISTS settings (
                 key TEXT PRIMARY KEY,
                 value TEXT,
@@ -279,30 +594,86 @@ class Database:
             )
         """)
 
-        await self._connection.commit()
+        await self._writer.commit()
+
+    async def _create_search_index(self) -> bool:
+        """
+        Create the trigram full-text index used by stream search.
+
+        The trigram tokenizer matches arbitrary substrings, so MATCH gives the
+        same results as LIKE '%term%' for terms of 3+ characters. Triggers keep
+        it in sync; they only fire on the searched columns, not on the frequent
+        status and viewer updates.
+
+        Returns:
+            True if the index is available (SQLite built with FTS5, 3.34+)
+        """
+        cursor = await self._writer.execute(
+            "SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'streams_fts'"
+        )
+        exists = await cursor.fetchone() is not None
+
+        try:
+            await self._writer.execute("""
+                CREATE VIRTUAL TABLE IF NOT EXISTS streams_fts USING fts5(
+                    stream_id UNINDEXED, name, rtsp_url, group_name,
+                    tokenize = 'trigram'
+                )
+            """)
+        except aiosqlite.OperationalError as e:
+            logger.info(f"Full-text stream search unavailable, using LIKE: {e}")
+            return False
+
+        await self._writer.execute("""
+            CREATE TRIGGER IF NOT EXISTS streams_fts_insert AFTER INSERT ON streams BEGIN
+                INSERT INTO streams_fts (stream_id, name, rtsp_url, group_name)
+                VALUES (new.id, new.name, new.rtsp_url, new.group_name);
+            END
+        """)
+        await self._writer.execute("""
+            CREATE TRIGGER IF NOT EXISTS streams_fts_delete AFTER DELETE ON streams BEGIN
+                DELETE FROM streams_fts WHERE stream_id = old.id;
+            END
+        """)
+        await self._writer.execute("""
+            CREATE TRIGGER IF NOT EXISTS streams_fts_update
+            AFTER UPDATE OF name, rtsp_url, group_name ON streams BEGIN
+                UPDATE streams_fts SET name = new.name, rtsp_url = new.rtsp_url,
+                    group_name = new.group_name
+                WHERE stream_id = old.id;
+            END
+        """)
+
+        if not exists:
+            # Migration: index streams added before the search index existed
+            await self._writer.execute("""
+                INSERT INTO streams_fts (stream_id, name, rtsp_url, group_name)
+                SELECT id, name, rtsp_url, group_name FROM streams
+            """)
+        return True
 
     # ==================== User Management ====================
 
     async def is_setup_complete(self) -> bool:
         """Check if initial setup is complete (admin user exists)."""
-        cursor = await self._connection.execute(
+        row = await self._fetchone(
             "SELECT COUNT(*) FROM users WHERE is_admin = 1"
         )
-        row = await cursor.fetchone()
         return row[0] > 0
 
     async def create_user(self, username: str, password: str, is_admin: bool = False) -> User:
         """Create a new user."""
-        password_hash, password_salt = hash_password(password)
-        now = datetime.utcnow().isoformat()
-        cursor = await self._connection.execute(
-            """
-            INSERT INTO users (username, password_hash, password_salt, is_admin, created_at)
-            VALUES (?, ?, ?, ?, ?)
-            """,
-            (username, password_hash, password_salt, int(is_admin), now)
-        )
-        await self._connection.commit()
+        # PBKDF2 takes tens of milliseconds; keep it off the event loop
+        password_hash, password_salt = await asyncio.to_thread(hash_password, password)
+        now = _now_iso()
+        async with self._transaction() as connection:
+            cursor = await connection.execute(
+                """
+                INSERT INTO users (username, password_hash, password_salt, is_admin, created_at)
+                VALUES (?, ?, ?, ?, ?)
+                """,
+                (username, password_hash, password_salt, is_admin, now)
+            )
         return User(
             id=cursor.lastrowid,
             username=username,
@@ -314,92 +685,111 @@ class Database:
 
     async def get_user_by_username(self, username: str) -> Optional[User]:
         """Get user by username."""
-        cursor = await self._connection.execute(
+        row = await self._fetchone(
             "SELECT * FROM users WHERE username = ?", (username,)
         )
-        row = await cursor.fetchone()
         return User.from_row(row) if row else None
 
     async def verify_user(self, username: str, password: str) -> Optional[User]:
         """Verify user credentials."""
         user = await self.get_user_by_username(username)
-        if user and verify_password(password, user.password_hash, user.password_salt):
+        if user and await asyncio.to_thread(
+            verify_password, password, user.password_hash, user.password_salt
+        ):
             return user
         return None
 
     async def update_user_password(self, user_id: int, new_password: str):
         """Update user password."""
-        password_hash, password_salt = hash_password(new_password)
-        await self._connection.execute(
-            """
-            UPDATE users SET password_hash = ?, password_salt = ?
-            WHERE id = ?
-            """,
-            (password_hash, password_salt, user_id)
-        )
-        await self._connection.commit()
+        password_hash, password_salt = await asyncio.to_thread(hash_password, new_password)
+        async with self._transaction() as connection:
+            await connection.execute(
+                """
+                UPDATE users SET password_hash = ?, password_salt = ?
+                WHERE id = ?
+                """,
+                (password_hash, password_salt, user_id)
+            )
 
     # ==================== Session Management ====================
 
     async def create_session(self, user_id: int, expires_hours: int = 24) -> Session:
         """Create a new session."""
         token = secrets.token_urlsafe(32)
-        now = datetime.utcnow()
-        expires_at = (now + timedelta(hours=expires_hours)).isoformat()
-        cursor = await self._connection.execute(
-            """
-            INSERT INTO sessions (user_id, token, expires_at, created_at)
-            VALUES (?, ?, ?, ?)
-            """,
-            (user_id, token, expires_at, now.isoformat())
-        )
-        await self._connection.commit()
+        now = datetime.now(timezone.utc)
+        expires = now + timedelta(hours=expires_hours)
+        # Stored as naive UTC ISO strings, like every other timestamp column (_now_iso)
+        created_at = now.replace(tzinfo=None).isoformat()
+        expires_at = expires.replace(tzinfo=None).isoformat()
+        expires_at_ts = int(expires.timestamp())
+        async with self._transaction() as connection:
+            cursor = await connection.execute(
+                """
+                INSERT INTO sessions (user_id, token, expires_at, created_at, expires_at_ts)
+                VALUES (?, ?, ?, ?, ?)
+                """,
+                (user_id, token, expires_at, created_at, expires_at_ts)
+            )
         return Session(
             id=cursor.lastrowid,
             user_id=user_id,
             token=token,
             expires_at=expires_at,
-            created_at=now.isoformat()
+            created_at=created_at,
+            expires_at_ts=expires_at_ts
         )
 
     async def get_session(self, token: str) -> Optional[Session]:
-        """Get session by token."""
-        cursor = await self._connection.execute(
-            "SELECT * FROM sessions WHERE token = ?", (token,)
-        )
-        row = await cursor.fetchone()
-        if row:
-            session = Session.from_row(row)
-            # Check if expired
-            if datetime.fromisoformat(session.expires_at) < datetime.utcnow():
-                await self.delete_session(token)
+        """Get session by token (cached for SESSION_CACHE_TTL seconds in a bounded LRU)."""
+        cached = self._session_cache.get(token)
+        if cached is not None and cached[1] > time.monotonic():
+            session = cached[0]
+            self._session_cache.move_to_end(token)
+        else:
+            if cached is not None:
+                del self._session_cache[token]
+            row = await self._fetchone(
+                _SQL_GET_SESSION, (token,)
+            )
+            if not row:
                 return None
-            return session
-        return None
+            session = Session.from_row(row)
+            self._session_cache[token] = (session, time.monotonic() + self.SESSION_CACHE_TTL)
+            if len(self._session_cache) > self.SESSION_CACHE_SIZE:
+                self._session_cache.popitem(last=False)
+
+        # Check if expired
+        if session.expires_at_ts < time.time():
+            await self.delete_session(token)
+            return None
+        return session
 
     async def delete_session(self, token: str):
         """Delete a session."""
-        await self._connection.execute("DELETE FROM sessions WHERE token = ?", (token,))
-        await self._connection.commit()
+        self._session_cache.pop(token, None)
+        async with self._transaction() as connection:
+            await connection.execute("DELETE FROM sessions WHERE token = ?", (token,))
 
     async def get_user_by_session(self, token: str) -> Optional[User]:
         """Get user by session token."""
         session = await self.get_session(token)
         if not session:
             return None
-        cursor = await self._connection.execute(
-            "SELECT * FROM users WHERE id = ?", (session.user_id,)
+        row = await self._fetchone(
+            _SQL_GET_USER, (session.user_id,)
         )
-        row = await cursor.fetchone()
         return User.from_row(row) if row else None
 
     async def cleanup_expired_sessions(self):
         """Remove expired sessions."""
-        now = datetime.utcnow().isoformat()
-        await self._connection.execute(
-            "DELETE FROM sessions WHERE expires_at < ?", (now,)
-        )
-        await self._connection.commit()
+        now_ts = int(time.time())
+        async with self._transaction() as connection:
+            await connection.execute(
+                "DELETE FROM sessions WHERE expires_at_ts < ?", (now_ts,)
+            )
+
+        for token in [token for token, (session, _) in self._session_cache.items() if session.expires_at_ts < now_ts]:
+            del self._session_cache[token]
 
     # ==================== API Key Management ====================
 
@@ -408,15 +798,15 @@ class Database:
         raw_key = secrets.token_urlsafe(32)
         key_hash = hashlib.sha256(raw_key.encode()).hexdigest()
         key_prefix = raw_key[:8]
-        now = datetime.utcnow().isoformat()
-        cursor = await self._connection.execute(
-            """
-            INSERT INTO api_keys (name, key_hash, key_prefix, created_at)
-            VALUES (?, ?, ?, ?)
-            """,
-            (name, key_hash, key_prefix, now)
-        )
-        await self._connection.commit()
+        now = _now_iso()
+        async with self._transaction() as connection:
+            cursor = await connection.execute(
+                """
+                INSERT INTO api_keys (name, key_hash, key_prefix, created_at)
+                VALUES (?, ?, ?, ?)
+                """,
+                (name, key_hash, key_prefix, now)
+            )
         api_key = ApiKey(
             id=cursor.lastrowid,
             name=name,
@@ -429,87 +819,151 @@ class Database:
     async def verify_api_key(self, raw_key: str) -> Optional[ApiKey]:
         """Verify an API key and return the ApiKey if valid."""
         key_hash = hashlib.sha256(raw_key.encode()).hexdigest()
-        cursor = await self._connection.execute(
-            "SELECT * FROM api_keys WHERE key_hash = ?", (key_hash,)
-        )
-        row = await cursor.fetchone()
-        if row:
-            api_key = ApiKey.from_row(row)
-            # Update last_used
-            await self._connection.execute(
-                "UPDATE api_keys SET last_used = ? WHERE id = ?",
-                (datetime.utcnow().isoformat(), api_key.id)
+
+        api_key = self._api_key_cache.get(key_hash)
+        if api_key is not None:
+            self._api_key_cache.move_to_end(key_hash)
+        else:
+            # Narrow by the indexed prefix, then compare hashes in constant time
+            rows = await self._fetchall(
+                "SELECT * FROM api_keys WHERE key_prefix = ?", (raw_key[:8],)
             )
-            await self._connection.commit()
-            return api_key
-        return None
+            for row in rows:
+                if secrets.compare_digest(row["key_hash"], key_hash):
+                    api_key = ApiKey.from_row(row)
+                    break
+            if api_key is None:
+                return None
+
+            self._api_key_cache[key_hash] = api_key
+            if len(self._api_key_cache) > self.API_KEY_CACHE_SIZE:
+                self._api_key_cache.popitem(last=False)
+
+        # Update last_used at most once per interval per key
+        now = time.monotonic()
+        last_write = self._api_key_last_used.get(api_key.id)
+        if last_write is None or now - last_write >= self.API_KEY_LAST_USED_INTERVAL:
+            self._api_key_last_used[api_key.id] = now
+            api_key.last_used = _now_iso()
+            await self._write_queue.enqueue(
+                _SQL_TOUCH_API_KEY,
+                [(api_key.last_used, api_key.id)]
+            )
+        return api_key
 
     async def get_all_api_keys(self) -> List[ApiKey]:
         """Get all API keys (without the actual key)."""
-        cursor = await self._connection.execute(
+        rows = await self._fetchall(
             "SELECT * FROM api_keys ORDER BY created_at DESC"
         )
-        rows = await cursor.fetchall()
         return [ApiKey.from_row(row) for row in rows]
 
     async def delete_api_key(self, key_id: int):
         """Delete an API key."""
-        await self._connection.execute("DELETE FROM api_keys WHERE id = ?", (key_id,))
-        await self._connection.commit()
+        async with self._transaction() as connection:
+            await connection.execute("DELETE FROM api_keys WHERE id = ?", (key_id,))
+        self._api_key_last_used.pop(key_id, None)
+        for key_hash, api_key in list(self._api_key_cache.items()):
+            if api_key.id == key_id:
+                del self._api_key_cache[key_hash]
 
     # ==================== Stream Management ====================
 
     async def add_stream(self, stream: Stream) -> Stream:
         """Add a new stream."""
-        now = datetime.utcnow().isoformat()
-        stream_id = stream.id or generate_uid()
-        await self._connection.execute(
-            """
-            INSERT INTO streams (
-                id, name, rtsp_url, mode, status, video_codec, audio_codec,
-                resolution, framerate, bitrate, ffmpeg_overrides,
-                keep_alive_seconds, use_transcode, latency_mode,
-                created_at, updated_at
-            ) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
-            """,
-            (
-                stream_id, stream.name, stream.rtsp_url, stream.mode, stream.status,
-                stream.video_codec, stream.audio_codec, stream.resolution,
-                stream.framerate, stream.bitrate, stream.ffmpeg_overrides,
-                stream.keep_alive_seconds, int(stream.use_transcode),
-                stream.latency_mode, now, now
+        return (await self.add_streams([stream]))[0]
+
+    async def add_streams(self, streams: List[Stream]) -> List[Stream]:
+        """
+        Add several streams in one transaction (e.g. an NVR import).
+
+        Args:
+            streams: Streams to insert; missing IDs are generated
+
+        Returns:
+            The same streams with id and timestamps filled in
+
+        Raises:
+            aiosqlite.IntegrityError: If any RTSP URL already exists (nothing is inserted)
+        """
+        if not streams:
+            return []
+        now = _now_iso()
+        stream_ids = [stream.id or generate_uid() for stream in streams]
+        async with self._transaction() as connection:
+            await connection.executemany(
+                _SQL_INSERT_STREAM,
+                [
+                    (
+                        stream_id, stream.name, stream.rtsp_url, stream.mode, stream.status,
+                        stream.video_codec, stream.audio_codec, stream.resolution,
+                        stream.framerate, stream.bitrate, stream.ffmpeg_overrides,
+                        stream.keep_alive_seconds, stream.use_transcode,
+                        stream.latency_mode, stream.group_name, now, now
+                    )
+                    for stream_id, stream in zip(stream_ids, streams)
+                ]
             )
-        )
-        await self._connection.commit()
-        stream.id = stream_id
-        stream.created_at = now
-        stream.updated_at = now
-        return stream
+
+        for stream_id, stream in zip(stream_ids, streams):
+            self._stream_exists_cache.pop(stream_id, None)
+            stream.id = stream_id
+            stream.created_at = now
+            stream.updated_at = now
+        return streams
 
     async def get_stream(self, stream_id: str) -> Optional[Stream]:
         """Get stream by ID."""
-        cursor = await self._connection.execute(
-            "SELECT * FROM streams WHERE id = ?", (stream_id,)
+        row = await self._fetchone(
+            _SQL_GET_STREAM, (stream_id,)
         )
-        row = await cursor.fetchone()
         if row:
             return Stream.from_row(row)
         return None
 
+    async def stream_exists(self, stream_id: str) -> bool:
+        """
+        Check whether a stream exists.
+
+        Hits are cached for STREAM_EXISTS_TTL seconds in a bounded LRU;
+        misses are not cached, so probing unknown IDs can't grow it.
+        """
+        now = time.monotonic()
+        expires = self._stream_exists_cache.get(stream_id)
+        if expires is not None:
+            if expires > now:
+                self._stream_exists_cache.move_to_end(stream_id)
+                return True
+            del self._stream_exists_cache[stream_id]
+
+        row = await self._fetchone(
+            _SQL_STREAM_EXISTS, (stream_id,)
+        )
+        if row is None:
+            return False
+
+        self._stream_exists_cache[stream_id] = now + self.STREAM_EXISTS_TTL
+        if len(self._stream_exists_cache) > self.STREAM_EXISTS_CACHE_SIZE:
+            self._stream_exists_cache.popitem(last=False)
+        return True
+
     async def get_stream_by_url(self, rtsp_url: str) -> Optional[Stream]:
         """Get stream by RTSP URL."""
-        cursor = await self._connection.execute(
+        row = await self._fetchone(
             "SELECT * FROM streams WHERE rtsp_url = ?", (rtsp_url,)
         )
-        row = await cursor.fetchone()
         if row:
             return Stream.from_row(row)
         return None
 
+    async def get_all_stream_ids(self) -> set[str]:
+        """Get the IDs of all streams."""
+        rows = await self._fetchall("SELECT id FROM streams")
+        return {row[0] for row in rows}
+
     async def get_all_streams(self) -> List[Stream]:
         """Get all streams."""
-        cursor = await self._connection.execute("SELECT * FROM streams ORDER BY id")
-        rows = await cursor.fetchall()
+        rows = await self._fetchall("SELECT * FROM streams ORDER BY id")
         return [Stream.from_row(row) for row in rows]
 
     async def get_streams_paginated(
@@ -528,7 +982,11 @@ class Database:
         conditions = []
         params = []
 
-        if search:
+        if search and self._search_fts and len(search) >= 3:
+            # Quoted as one phrase; trigrams can't match terms under 3 characters
+            conditions.append("id IN (SELECT stream_id FROM streams_fts WHERE streams_fts MATCH ?)")
+            params.append('"' + search.replace('"', '""') + '"')
+        elif search:
             conditions.append("(name LIKE ? OR rtsp_url LIKE ? OR group_name LIKE ?)")
             params.extend([f"%{search}%", f"%{search}%", f"%{search}%"])
 
@@ -552,28 +1010,31 @@ class Database:
             sort_by = "id"
         sort_order = "DESC" if sort_order.lower() == "desc" else "ASC"
 
-        # Get total count
-        count_cursor = await self._connection.execute(
-            f"SELECT COUNT(*) FROM streams WHERE {where_clause}", params
-        )
-        total = (await count_cursor.fetchone())[0]
-
-        # Get paginated results
+        # Get paginated results, with the total count from a window over the same WHERE
         offset = (page - 1) * per_page
         query = f"""
-            SELECT * FROM streams
+            SELECT *, COUNT(*) OVER () AS total FROM streams
             WHERE {where_clause}
             ORDER BY {sort_by} {sort_order}
             LIMIT ? OFFSET ?
         """
-        cursor = await self._connection.execute(query, params + [per_page, offset])
-        rows = await cursor.fetchall()
+        rows = await self._fetchall(query, params + [per_page, offset])
+
+        if rows:
+            total = rows[0]["total"]
+        elif offset > 0:
+            # Page past the end: no row to carry the count
+            total = (await self._fetchone(
+                f"SELECT COUNT(*) FROM streams WHERE {where_clause}", params
+            ))[0]
+        else:
+            total = 0
 
         return [Stream.from_row(row) for row in rows], total
 
     async def get_stream_counts(self) -> dict:
         """Get counts by status and mode for quick stats."""
-        cursor = await self._connection.execute("""
+        row = await self._fetchone("""
             SELECT
                 COUNT(*) as total,
                 SUM(CASE WHEN status = 'running' THEN 1 ELSE 0 END) as running,
@@ -583,144 +1044,136 @@ class Database:
                 SUM(CASE WHEN mode = 'on_demand' THEN 1 ELSE 0 END) as on_demand
             FROM streams
         """)
-        row = await cursor.fetchone()
         return dict(row) if row else {}
 
-    async def batch_update_status(self, stream_ids: List[int], status: str):
+    async def batch_update_status(self, stream_ids: List[str], status: str):
         """Update status for multiple streams at once."""
         if not stream_ids:
             return
-        placeholders = ",".join("?" * len(stream_ids))
-        now = datetime.utcnow().isoformat()
-        await self._connection.execute(
-            f"UPDATE streams SET status = ?, updated_at = ? WHERE id IN ({placeholders})",
-            [status, now] + stream_ids
+        now = _now_iso()
+        await self._write_queue.enqueue(
+            _SQL_SET_STATUS,
+            [(status, now, stream_id) for stream_id in stream_ids]
         )
-        await self._connection.commit()
 
     async def update_stream(self, stream: Stream) -> Stream:
         """Update stream."""
-        stream.updated_at = datetime.utcnow().isoformat()
-        await self._connection.execute(
-            """
-            UPDATE streams SET
-                name = ?, rtsp_url = ?, mode = ?, status = ?,
-                video_codec = ?, audio_codec = ?, resolution = ?,
-                framerate = ?, bitrate = ?, ffmpeg_overrides = ?,
-                viewer_count = ?, last_viewer_time = ?, last_error = ?,
-                pid = ?, keep_alive_seconds = ?, use_transcode = ?,
-                latency_mode = ?, group_name = ?, thumbnail = ?,
-                thumbnail_updated = ?, updated_at = ?
-            WHERE id = ?
-            """,
-            (
-                stream.name, stream.rtsp_url, stream.mode, stream.status,
-                stream.video_codec, stream.audio_codec, stream.resolution,
-                stream.framerate, stream.bitrate, stream.ffmpeg_overrides,
-                stream.viewer_count, stream.last_viewer_time, stream.last_error,
-                stream.pid, stream.keep_alive_seconds, int(stream.use_transcode),
-                stream.latency_mode, stream.group_name, stream.thumbnail,
-                stream.thumbnail_updated, stream.updated_at, stream.id
+        stream.updated_at = _now_iso()
+        async with self._transaction() as connection:
+            await connection.execute(
+                """
+                UPDATE streams SET
+                    name = ?, rtsp_url = ?, mode = ?, status = ?,
+                    video_codec = ?, audio_codec = ?, resolution = ?,
+                    framerate = ?, bitrate = ?, ffmpeg_overrides = ?,
+                    viewer_count = ?, last_viewer_time = ?, last_error = ?,
+                    pid = ?, keep_alive_seconds = ?, use_transcode = ?,
+                    latency_mode = ?, group_name = ?, thumbnail = ?,
+                    thumbnail_updated = ?, updated_at = ?
+                WHERE id = ?
+                """,
+                (
+                    stream.name, stream.rtsp_url, stream.mode, stream.status,
+                    stream.video_codec, stream.audio_codec, stream.resolution,
+                    stream.framerate, stream.bitrate, stream.ffmpeg_overrides,
+                    stream.viewer_count, stream.last_viewer_time, stream.last_error,
+                    stream.pid, stream.keep_alive_seconds, stream.use_transcode,
+                    stream.latency_mode, stream.group_name, stream.thumbnail,
+                    stream.thumbnail_updated, stream.updated_at, stream.id
+                )
             )
-        )
-        await self._connection.commit()
         return stream
 
-    async def update_stream_thumbnail(self, stream_id: str, thumbnail: str):
-        """Update stream thumbnail."""
-        now = datetime.utcnow().isoformat()
-        await self._connection.execute(
-            """
-            UPDATE streams SET thumbnail = ?, thumbnail_updated = ?, updated_at = ?
-            WHERE id = ?
-            """,
-            (thumbnail, now, now, stream_id)
-        )
-        await self._connection.commit()
+    async def update_stream_thumbnail(self, stream_id: str, thumbnail: bytes):
+        """Update stream thumbnail (raw JPEG bytes)."""
+        now = _now_iso()
+        async with self._transaction() as connection:
+            await connection.execute(
+                """
+                UPDATE streams SET thumbnail = ?, thumbnail_updated = ?, updated_at = ?
+                WHERE id = ?
+                """,
+                (thumbnail, now, now, stream_id)
+            )
 
     async def get_groups(self) -> List[str]:
         """Get all unique group names."""
-        cursor = await self._connection.execute(
+        rows = await self._fetchall(
             "SELECT DISTINCT group_name FROM streams WHERE group_name IS NOT NULL ORDER BY group_name"
         )
-        rows = await cursor.fetchall()
         return [row[0] for row in rows]
 
     async def delete_stream(self, stream_id: str) -> bool:
         """Delete stream."""
-        cursor = await self._connection.execute(
-            "DELETE FROM streams WHERE id = ?", (stream_id,)
-        )
-        await self._connection.commit()
+        async with self._transaction() as connection:
+            cursor = await connection.execute(
+                "DELETE FROM streams WHERE id = ?", (stream_id,)
+            )
+        self._stream_exists_cache.pop(stream_id, None)
         return cursor.rowcount > 0
 
     async def update_stream_status(
         self, stream_id: str, status: StreamStatus,
         error: str = None, pid: int = None
     ):
-        """Update stream status quickly."""
-        now = datetime.utcnow().isoformat()
-        await self._connection.execute(
-            """
-            UPDATE streams SET status = ?, last_error = ?, pid = ?, updated_at = ?
-            WHERE id = ?
-            """,
-            (status.value, error, pid, now, stream_id)
+        """Update stream status quickly (batched with other small writes)."""
+        now = _now_iso()
+        await self._write_queue.enqueue(
+            _SQL_UPDATE_STATUS,
+            [(status.value, error, pid, now, stream_id)]
         )
-        await self._connection.commit()
 
     async def update_viewer_count(self, stream_id: str, count: int):
         """Update viewer count."""
-        now = datetime.utcnow().isoformat()
-        await self._connection.execute(
-            """
-            UPDATE streams SET viewer_count = ?, last_viewer_time = ?, updated_at = ?
-            WHERE id = ?
-            """,
-            (count, now, now, stream_id)
+        await self.update_viewer_counts_bulk([(stream_id, count)])
+
+    async def update_viewer_counts_bulk(self, counts: List[tuple[str, int]]):
+        """Update viewer counts for several streams in one transaction."""
+        if not counts:
+            return
+        now = _now_iso()
+        await self._write_queue.enqueue(
+            _SQL_UPDATE_VIEWERS,
+            [(count, now, now, stream_id) for stream_id, count in counts]
         )
-        await self._connection.commit()
 
     async def get_always_on_streams(self) -> List[Stream]:
         """Get all always-on streams."""
-        cursor = await self._connection.execute(
+        rows = await self._fetchall(
             "SELECT * FROM streams WHERE mode = ?", (StreamMode.ALWAYS_ON.value,)
         )
-        rows = await cursor.fetchall()
         return [Stream.from_row(row) for row in rows]
 
     # ==================== Settings Management ====================
 
     async def get_setting(self, key: str) -> Optional[str]:
         """Get a setting value by key."""
-        cursor = await self._connection.execute(
+        row = await self._fetchone(
             "SELECT value FROM settings WHERE key = ?", (key,)
         )
-        row = await cursor.fetchone()
         return row[0] if row else None
 
     async def set_setting(self, key: str, value: str):
         """Set a setting value."""
-        now = datetime.utcnow().isoformat()
-        await self._connection.execute(
-            """
-            INSERT INTO settings (key, value, updated_at)
-            VALUES (?, ?, ?)
-            ON CONFLICT(key) DO UPDATE SET value = ?, updated_at = ?
-            """,
-            (key, value, now, value, now)
-        )
-        await self._connection.commit()
+        now = _now_iso()
+        async with self._transaction() as connection:
+            await connection.execute(
+                """
+                INSERT INTO settings (key, value, updated_at)
+                VALUES (?, ?, ?)
+                ON CONFLICT(key) DO UPDATE SET value = ?, updated_at = ?
+                """,
+                (key, value, now, value, now)
+            )
 
     async def delete_setting(self, key: str):
         """Delete a setting."""
-        await self._connection.execute("DELETE FROM settings WHERE key = ?", (key,))
-        await self._connection.commit()
+        async with self._transaction() as connection:
+            await connection.execute("DELETE FROM settings WHERE key = ?", (key,))
 
     async def get_all_settings(self) -> Dict[str, str]:
         """Get all settings."""
-        cursor = await self._connection.execute("SELECT key, value FROM settings")
-        rows = await cursor.fetchall()
+        rows = await self._fetchall("SELECT key, value FROM settings")
         return {row[0]: row[1] for row in rows}
 
     async def get_runtime_settings(self) -> Dict[str, Any]:
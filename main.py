@@ -1,18 +1,28 @@
 """RTSP to HLS Streaming Server - Main Application."""
 
+import asyncio
+import hashlib
 import logging
+import stat
 import sys
 from contextlib import asynccontextmanager
 from pathlib import Path
 
 from fastapi import FastAPI, Request, HTTPException
 from fastapi.staticfiles import StaticFiles
-from fastapi.responses import FileResponse, HTMLResponse
+from fastapi.responses import FileResponse, HTMLResponse, JSONResponse, ORJSONResponse, Response
 from fastapi.middleware.cors import CORSMiddleware
 
+try:
+    import orjson  # noqa: F401 - used by ORJSONResponse
+    ORJSON_AVAILABLE = True
+except ImportError:
+    ORJSON_AVAILABLE = False
+
 from config import settings
 from database import db
 from core.stream_manager import stream_manager
+from core.vision_analyzer import vision_analyzer
 from api.streams import router as streams_router
 from api.webrtc import router as webrtc_router
 from api.nvr import router as nvr_router
@@ -37,6 +47,9 @@ async def lifespan(app: FastAPI):
     logger.info("Starting RTSP to HLS Server...")
     await db.connect()
     await stream_manager.start()
+    if await db.get_setting("claude_api_key"):
+        # Don't hold up startup on network latency
+        asyncio.create_task(vision_analyzer.warmup())
     logger.info(f"Server ready at http://{settings.host}:{settings.port}")
 
     yield
@@ -44,6 +57,7 @@ async def lifespan(app: FastAPI):
     # Shutdown
     logger.info("Shutting down...")
     await stream_manager.stop()
+    await vision_analyzer.close()
     await db.close()
     logger.info("Shutdown complete")
 
@@ -54,6 +68,8 @@ app = FastAPI(
     description="Convert RTSP streams to HLS with auto-configuration",
     version="1.0.0",
     lifespan=lifespan,
+    # orjson encodes API responses (stream listings etc.) in C when installed
+    default_response_class=ORJSONResponse if ORJSON_AVAILABLE else JSONResponse,
     docs_url="/docs" if settings.debug else None,
     redoc_url="/redoc" if settings.debug else None,
 )
@@ -105,9 +121,36 @@ async def serve_hls(stream_id: str, filename: str, request: Request):
     else:
         raise HTTPException(status_code=400, detail="Invalid file type")
 
-    # Check if stream exists
-    stream = await db.get_stream(stream_id)
-    if not stream:
+    if is_segment:
+        # Segments of running streams are served straight from disk
+        segment_path = stream_manager.segment_path(stream_id, filename)
+        try:
+            stat_result = segment_path.stat() if segment_path else None
+        except OSError:
+            stat_result = None
+        if stat_result is None or not stat.S_ISREG(stat_result.st_mode):
+            raise HTTPException(status_code=404, detail="Segment not found")
+
+        headers = {
+            "Cache-Control": "no-cache, no-store, must-revalidate",
+            "Access-Control-Allow-Origin": "*",
+        }
+
+        if settings.hls_accel_redirect:
+            # Behind nginx: let it send the file from its internal location
+            headers["X-Accel-Redirect"] = f"{settings.hls_accel_redirect.rstrip('/')}/{stream_id}/{filename}"
+            return Response(media_type="video/mp2t", headers=headers)
+
+        # Reuse the stat so FileResponse doesn't stat the segment again
+        return FileResponse(
+            segment_path,
+            media_type="video/mp2t",
+            headers=headers,
+            stat_result=stat_result,
+        )
+
+    # Check if stream exists (cached, players re-fetch the playlist every segment)
+    if not await db.stream_exists(stream_id):
         raise HTTPException(status_code=404, detail="Stream not found")
 
     # Build file path
@@ -120,12 +163,8 @@ async def serve_hls(stream_id: str, filename: str, request: Request):
             viewer_id = generate_viewer_id()
             success = await stream_manager.start_stream(stream_id, viewer_id)
             if success:
-                # Wait a bit for first segment
-                import asyncio
-                for _ in range(30):  # Wait up to 15 seconds
-                    await asyncio.sleep(0.5)
-                    if file_path.exists():
-                        break
+                # Wait for FFmpeg to write the first playlist
+                await stream_manager.wait_for_playlist(stream_id, timeout=settings.startup_timeout)
 
         if not file_path.exists():
             raise HTTPException(
@@ -133,14 +172,9 @@ async def serve_hls(stream_id: str, filename: str, request: Request):
                 detail="Stream not ready. Please wait a moment and retry."
             )
 
-    # Determine content type
-    content_type = "application/vnd.apple.mpegurl"
-    if filename.endswith(".ts"):
-        content_type = "video/mp2t"
-
     return FileResponse(
         file_path,
-        media_type=content_type,
+        media_type="application/vnd.apple.mpegurl",
         headers={
             "Cache-Control": "no-cache, no-store, must-revalidate",
             "Access-Control-Allow-Origin": "*",
@@ -149,14 +183,27 @@ async def serve_hls(stream_id: str, filename: str, request: Request):
 
 
 # Static files and UI
+INDEX_PATH = Path(__file__).parent / "static" / "index.html"
+
+
+def _load_index() -> tuple[bytes, str]:
+    """Read index.html and compute its ETag."""
+    body = INDEX_PATH.read_bytes()
+    return body, f'"{hashlib.sha1(body).hexdigest()}"'
+
+
+# Loaded once; debug mode re-reads it on every request so edits show up
+INDEX_HTML, INDEX_ETAG = _load_index()
+
+
 @app.get("/", response_class=HTMLResponse)
-async def index():
-    """Serve the main UI."""
-    index_path = Path(__file__).parent / "static" / "index.html"
-    return FileResponse(
-        index_path,
-        headers={"Cache-Control": "no-cache, no-store, must-revalidate"}
-    )
+async def index(request: Request):
+    """Serve the main UI from memory, revalidated by ETag."""
+    body, etag = _load_index() if settings.debug else (INDEX_HTML, INDEX_ETAG)
+    headers = {"Cache-Control": "no-cache", "ETag": etag}
+    if request.headers.get("if-none-match") == etag:
+        return Response(status_code=304, headers=headers)
+    return HTMLResponse(body, headers=headers)
 
 
 # Mount static files